@@ -5,23 +5,36 @@
 """
 
 import base64
-from typing import List, Tuple, Dict, Optional
+import binascii
+import functools
+from typing import List, Tuple, Dict, Optional, Union
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # 可选依赖, 缺失时使用标准库两步解码
+    np = None
+    njit = None
 
 
 # 标准 Base64 字母表
 STD_B64_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
 
 
-def build_char_map(from_alphabet: str, to_alphabet: str) -> Dict[str, str]:
+@functools.lru_cache(maxsize=4)
+def build_char_map(from_alphabet: str, to_alphabet: str) -> Dict[int, int]:
     """
-    构建字符映射表
+    构建字符映射表 (带缓存)
+    
+    返回 str.maketrans 生成的码点映射表, 可直接用于 str.translate。
+    本模块只会用到 custom<->std 两组字母表, 因此结果按参数缓存。
     
     Args:
         from_alphabet: 源字母表 (64个字符)
         to_alphabet: 目标字母表 (64个字符)
     
     Returns:
-        字符映射字典
+        码点映射字典 (ord -> ord)
     
     Raises:
         ValueError: 字母表长度不是64
@@ -29,24 +42,23 @@ def build_char_map(from_alphabet: str, to_alphabet: str) -> Dict[str, str]:
     if len(from_alphabet) != 64 or len(to_alphabet) != 64:
         raise ValueError("Alphabet must be 64 chars")
     
-    return {from_alphabet[i]: to_alphabet[i] for i in range(64)}
+    return str.maketrans(from_alphabet, to_alphabet)
 
 
-def map_string_with_dict(s: str, char_map: Dict[str, str]) -> str:
+def map_string_with_dict(s: str, char_map: Dict[int, int]) -> str:
     """
     使用字符映射表转换字符串
     
+    未出现在映射表中的字符保持不变。
+    
     Args:
         s: 输入字符串
-        char_map: 字符映射字典
+        char_map: build_char_map 返回的码点映射表
     
     Returns:
         转换后的字符串
     """
-    result = []
-    for char in s:
-        result.append(char_map.get(char, char))
-    return "".join(result)
+    return s.translate(char_map)
 
 
 def map_custom_to_std_b64(data: str, custom_alphabet: str) -> str:
@@ -60,8 +72,7 @@ def map_custom_to_std_b64(data: str, custom_alphabet: str) -> str:
     Returns:
         标准 Base64 编码的数据
     """
-    char_map = build_char_map(custom_alphabet, STD_B64_ALPHABET)
-    return map_string_with_dict(data, char_map)
+    return _translate_alphabet(data, custom_alphabet, STD_B64_ALPHABET)
 
 
 def map_std_to_custom_b64(data: str, custom_alphabet: str) -> str:
@@ -75,42 +86,247 @@ def map_std_to_custom_b64(data: str, custom_alphabet: str) -> str:
     Returns:
         自定义 Base64 编码的数据
     """
-    char_map = build_char_map(STD_B64_ALPHABET, custom_alphabet)
-    return map_string_with_dict(data, char_map)
+    return _translate_alphabet(data, STD_B64_ALPHABET, custom_alphabet)
+
+
+def _translate_alphabet(data: str, from_alphabet: str, to_alphabet: str) -> str:
+    """
+    按字母表转换字符串
+    
+    全 ASCII 时在字节上用 256 字节映射表做 bytes.translate (C 层逐字节查表,
+    比 str.translate 的码点字典查找快数倍); 含非 ASCII 字符时回退到 str.translate。
+    """
+    if data.isascii() and from_alphabet.isascii() and to_alphabet.isascii():
+        table = build_byte_map(from_alphabet, to_alphabet)
+        return data.encode('ascii').translate(table).decode('ascii')
+    return data.translate(build_char_map(from_alphabet, to_alphabet))
+
+
+@functools.lru_cache(maxsize=4)
+def build_byte_map(from_alphabet: str, to_alphabet: str) -> bytes:
+    """
+    构建 256 字节的字节映射表 (带缓存)
+    
+    lut[from_alphabet[i]] = to_alphabet[i], 其他字节保持不变,
+    可直接用于 bytes.translate。
+    
+    Args:
+        from_alphabet: 源字母表 (64个 ASCII 字符)
+        to_alphabet: 目标字母表 (64个 ASCII 字符)
+    
+    Returns:
+        256 字节映射表
+    
+    Raises:
+        ValueError: 字母表长度不是64
+    """
+    if len(from_alphabet) != 64 or len(to_alphabet) != 64:
+        raise ValueError("Alphabet must be 64 chars")
+    
+    return bytes.maketrans(from_alphabet.encode('ascii'), to_alphabet.encode('ascii'))
 
 
-def decode_base64_to_bytes(b64_str: str) -> bytes:
+def map_custom_to_std_b64_bytes(data: Union[str, bytes], custom_alphabet: str) -> bytes:
+    """
+    将自定义 Base64 编码转换为标准 Base64 编码 (字节版本)
+    
+    直接在 ASCII 字节上做 bytes.translate, 结果可直接交给 base64 解码,
+    省去 str 映射和 b64decode 内部的 str -> bytes 转码。
+    
+    Args:
+        data: 自定义 Base64 编码的数据 (str 须为 ASCII)
+        custom_alphabet: 自定义的 64 字符字母表
+    
+    Returns:
+        标准 Base64 编码的字节
+    
+    Raises:
+        UnicodeEncodeError: data 含非 ASCII 字符
+    """
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    return data.translate(build_byte_map(custom_alphabet, STD_B64_ALPHABET))
+
+
+def decode_base64_to_bytes(b64_str: Union[str, bytes]) -> bytes:
     """
     将 Base64 字符串解码为字节数组
     
-    自动处理 padding (补齐 '=' 字符)
+    自动处理 padding (补齐 '=' 字符)。字节输入直接交给 binascii.a2b_base64,
+    跳过 base64.b64decode 的参数转换层 (两者在 validate=False 时行为相同)。
     
     Args:
-        b64_str: Base64 编码的字符串
+        b64_str: Base64 编码的字符串或 ASCII 字节
     
     Returns:
         解码后的字节数组
     """
     # 计算需要补齐的 padding
     padding_needed = (4 - len(b64_str) % 4) % 4
-    b64_str_padded = b64_str + "=" * padding_needed
+    if padding_needed:
+        pad = b"=" if isinstance(b64_str, (bytes, bytearray)) else "="
+        b64_str = b64_str + pad * padding_needed
+    
+    if isinstance(b64_str, (bytes, bytearray)):
+        return binascii.a2b_base64(b64_str)
+    return base64.b64decode(b64_str)
+
+# 融合解码查表值: '=' 填充符 / 非字母表字符
+_LUT_PAD = 64
+_LUT_INVALID = 255
+
+# 短于该长度的输入直接走标准库两步路径: 两者都在 C 层完成, 短输入上融合内核
+# 没有优势, 而首次调用内核需要加载 / 编译 (数百毫秒), 不应由启动时的一次性解码承担
+_FUSED_MIN_LENGTH = 1024
+
+
+@functools.lru_cache(maxsize=4)
+def is_fusable_alphabet(custom_alphabet: str) -> bool:
+    """
+    检查字母表能否使用融合解码内核 (带缓存)
+    
+    内核把字节 '=' 一律视为填充符, 并按字节查表, 因此要求字母表恰好是
+    64 个互不相同、不含 '=' 的 ASCII 字符; 其他字母表走两步解码路径。
+    """
+    return (
+        len(custom_alphabet) == 64
+        and custom_alphabet.isascii()
+        and "=" not in custom_alphabet
+        and len(set(custom_alphabet)) == 64
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def build_decode_lut(custom_alphabet: str) -> bytes:
+    """
+    构建自定义字母表的 Base64 解码查找表 (带缓存)
+    
+    直接把自定义字符映射到 6 位数值 (0-63), 跳过"先换成标准字母表"这一步;
+    '=' 映射为 64, 其他字节映射为 255。
+    
+    Args:
+        custom_alphabet: 自定义的 64 字符字母表 (须满足 is_fusable_alphabet)
+    
+    Returns:
+        256 字节查找表
     
-    return base64.b64decode(b64_str_padded)
+    Raises:
+        ValueError: 字母表不满足 is_fusable_alphabet
+    """
+    if not is_fusable_alphabet(custom_alphabet):
+        raise ValueError("Alphabet must be 64 distinct ASCII chars without '='")
+    
+    lut = bytearray([_LUT_INVALID]) * 256
+    lut[ord("=")] = _LUT_PAD
+    for value, char in enumerate(custom_alphabet.encode('ascii')):
+        lut[char] = value
+    return bytes(lut)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _b64_decode_fused_kernel(buf, lut):
+        """
+        单趟完成 自定义字母表查表 + Base64 解码
+        
+        只处理"干净"输入 (全部为字母表字符, 末尾至多 2 个 '='),
+        遇到其他情况返回 ok=False, 由调用方回退到标准库路径以保持行为一致。
+        """
+        length = buf.shape[0]
+        n = length
+        while n > 0 and buf[n - 1] == 61:  # '='
+            n -= 1
+        rem = n % 4
+        if length - n > 2 or rem == 1:
+            return np.empty(0, np.uint8), False
+        
+        full = n - rem
+        out = np.empty(full // 4 * 3 + (rem - 1 if rem else 0), np.uint8)
+        o = 0
+        i = 0
+        while i < full:
+            v0 = lut[buf[i]]
+            v1 = lut[buf[i + 1]]
+            v2 = lut[buf[i + 2]]
+            v3 = lut[buf[i + 3]]
+            if (v0 | v1 | v2 | v3) > 63:
+                return np.empty(0, np.uint8), False
+            x = (np.uint32(v0) << 18) | (np.uint32(v1) << 12) | (np.uint32(v2) << 6) | np.uint32(v3)
+            out[o] = (x >> 16) & 0xFF
+            out[o + 1] = (x >> 8) & 0xFF
+            out[o + 2] = x & 0xFF
+            o += 3
+            i += 4
+        
+        if rem:
+            v0 = lut[buf[i]]
+            v1 = lut[buf[i + 1]]
+            v2 = lut[buf[i + 2]] if rem == 3 else 0
+            if (v0 | v1 | v2) > 63:
+                return np.empty(0, np.uint8), False
+            x = (np.uint32(v0) << 18) | (np.uint32(v1) << 12) | (np.uint32(v2) << 6)
+            out[o] = (x >> 16) & 0xFF
+            if rem == 3:
+                out[o + 1] = (x >> 8) & 0xFF
+        
+        return out, True
+
+
+def decode_custom_b64(data: Union[str, bytes], custom_alphabet: str) -> bytes:
+    """
+    解码自定义字母表的 Base64 数据
+    
+    等价于 decode_base64_to_bytes(map_custom_to_std_b64(data, alphabet))。
+    安装了 numba、字母表满足 is_fusable_alphabet 且输入不短于 _FUSED_MIN_LENGTH 时
+    用融合内核单趟完成查表和解码, 不产生中间字符串; 否则 (或输入不规整时)
+    走标准库两步路径。
+    
+    Args:
+        data: 自定义 Base64 编码的数据 (字节须为 ASCII)
+        custom_alphabet: 自定义的 64 字符字母表
+    
+    Returns:
+        解码后的字节数组
+    """
+    if not custom_alphabet.isascii() or (isinstance(data, str) and not data.isascii()):
+        # 非 ASCII 字母表 / 数据无法按字节查表: 与原实现一致走 str 映射
+        if not isinstance(data, str):
+            data = data.decode('ascii')
+        return decode_base64_to_bytes(map_custom_to_std_b64(data, custom_alphabet))
+    
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    
+    if njit is not None and len(data) >= _FUSED_MIN_LENGTH and is_fusable_alphabet(custom_alphabet):
+        lut = np.frombuffer(build_decode_lut(custom_alphabet), dtype=np.uint8)
+        out, ok = _b64_decode_fused_kernel(np.frombuffer(data, dtype=np.uint8), lut)
+        if ok:
+            return out.tobytes()
+    
+    return decode_base64_to_bytes(map_custom_to_std_b64_bytes(data, custom_alphabet))
 
 
 def bytes_to_string(data: bytes, offset: int, length: int) -> str:
     """
     从字节数组中提取指定范围的内容并转换为字符串
     
+    每个字节按 Latin-1 映射为同值码点 (等价于逐字节 chr)。
+    
     Args:
-        data: 字节数组
+        data: 字节数组 (bytes / bytearray / memoryview)
         offset: 起始偏移量
         length: 提取长度
     
     Returns:
         提取的字符串
+    
+    Raises:
+        IndexError: 数据长度不足
     """
-    return "".join(chr(data[offset + i]) for i in range(length))
+    chunk = data[offset:offset + length]
+    if len(chunk) != length:
+        raise IndexError("bytes_to_string: range out of bounds")
+    return bytes(chunk).decode('latin-1')
 
 
 class StringOperations:
@@ -152,13 +368,15 @@ class StringOperations:
         Returns:
             移位后的字符串
         """
-        if not s:
+        n = len(s)
+        if not n:
             return s
         
-        shift = shift % len(s)
-        # 逆向移位: 向右移动 = 从 (length - shift) 处切分
-        actual_shift = (len(s) - shift) % len(s)
-        return s[actual_shift:] + s[:actual_shift]
+        # 逆向移位: 向右移动 = 从 (length - shift) 处切分, 合并为一次取模
+        k = (-shift) % n
+        if not k:
+            return s
+        return s[k:] + s[:k]
     
     @staticmethod
     def invert_op_2(s: str, length: int) -> str:
@@ -191,28 +409,73 @@ class StringOperations:
         return s[:len(s) - length] if len(s) >= length else ""
 
 
-def invert_ops(data: str, ops: List[Tuple[int, int]]) -> str:
+def _apply_fused(data: Union[str, bytes], reverse: bool, shift: int, head: int, tail: int) -> Union[str, bytes]:
+    """
+    一次性应用融合后的变换: 先裁剪首尾, 再循环右移, 最后按需反转
+    
+    Args:
+        data: 输入字符串或字节
+        reverse: 是否反转
+        shift: 累计的右移量 (未取模)
+        head: 累计的前缀裁剪长度
+        tail: 累计的后缀裁剪长度
+    
+    Returns:
+        变换后的字符串
+    """
+    n = len(data)
+    if head or tail:
+        data = data[head:n - tail] if head + tail <= n else data[:0]
+        n = len(data)
+    if n:
+        k = shift % n
+        if k:
+            data = data[n - k:] + data[:n - k]
+    return data[::-1] if reverse else data
+
+
+def invert_ops(data: Union[str, bytes], ops: List[Tuple[int, int]]) -> Union[str, bytes]:
     """
     按逆序执行操作列表的逆操作
     
+    不逐个生成中间字符串, 而是把连续的逆操作折叠为
+    (reverse, shift, head, tail) 四个累加量后一次性应用:
+    - 反转与移位满足交换关系 (反转后右移 p 等价于先右移 -p 再反转)
+    - 首尾裁剪与反转满足交换关系 (反转后裁前缀等价于先裁后缀再反转)
+    - 连续裁剪长度可直接相加
+    
+    只有当裁剪出现在非零移位之后时 (两者不可交换), 才先落地一次中间结果。
+    
     Args:
-        data: 输入字符串
+        data: 输入字符串 (也可以是字节, 按字节执行同样的变换)
         ops: 操作列表, 每个元素为 (操作ID, 参数)
     
     Returns:
-        执行所有逆操作后的字符串
+        执行所有逆操作后的结果 (与 data 类型相同)
     """
     result = data
+    reverse = False
+    shift = head = tail = 0
     
     # 从后向前遍历操作列表
     for op_id, param in reversed(ops):
         if op_id == 0:
-            result = StringOperations.invert_op_0(result)
+            reverse = not reverse
         elif op_id == 1:
-            result = StringOperations.invert_op_1(result, param)
-        elif op_id == 2:
-            result = StringOperations.invert_op_2(result, param)
-        elif op_id == 3:
-            result = StringOperations.invert_op_3(result, param)
+            shift = shift - param if reverse else shift + param
+        elif op_id == 2 or op_id == 3:
+            length = max(0, int(param))
+            if shift:
+                # 移位后再裁剪无法交换, 先落地当前结果
+                n = len(result) - head - tail
+                if n > 0 and shift % n:
+                    result = _apply_fused(result, False, shift, head, tail)
+                    head = tail = 0
+                shift = 0
+            # 反转状态下裁前缀等价于裁原串的后缀
+            if (op_id == 2) != reverse:
+                head += length
+            else:
+                tail += length
     
-    return result
+    return _apply_fused(result, reverse, shift, head, tail)
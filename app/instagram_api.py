@@ -12,18 +12,25 @@ _s = SHA256(data + timestamp + secret_key)
 - secret_key: 动态密钥 (从远程JS自动提取)
 """
 
-import hashlib
-import hmac
+import asyncio
 import json
 import time
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Union
 from urllib.parse import quote
 
+try:
+    import orjson
+except ImportError:  # 可选依赖, 缺失时使用标准库 json
+    orjson = None
+
 from curl_cffi import requests as curl_requests
-from curl_cffi.requests import AsyncSession
+from curl_cffi.requests import AsyncSession, Headers
+from curl_cffi.requests.exceptions import HTTPError
 from pydantic import BaseModel, Field
 
+from .signature import hmac_sha256_hex, hmac_sha256_hex_batch, serialize_sorted
+
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -41,6 +48,9 @@ DEFAULT_SECRET_KEY = "6c14d82216be80781fb79e3884392f2f79031225ea7e1c5f708d808061
 # 默认的固定服务器时间戳 (从请求中观察到的固定值)
 DEFAULT_FIXED_TS = 1770242354891
 
+# 单个会话的最大并发连接数
+DEFAULT_MAX_CLIENTS = 20
+
 
 def get_dynamic_secret_key() -> str:
     """
@@ -67,6 +77,38 @@ def get_dynamic_secret_key() -> str:
     return DEFAULT_SECRET_KEY
 
 
+# 默认密钥的字节形式
+_DEFAULT_SECRET_KEY_BYTES = bytes.fromhex(DEFAULT_SECRET_KEY)
+
+
+def get_dynamic_secret_key_bytes() -> bytes:
+    """
+    获取动态密钥的字节形式
+    
+    优先使用 key_updater 中预解码的密钥字节, 避免签名时重复 bytes.fromhex;
+    否则回退到 get_dynamic_secret_key() 的结果。
+    """
+    try:
+        from .key_updater import key_state
+        if key_state.current_secret_bytes:
+            return key_state.current_secret_bytes
+    except Exception as e:
+        logger.warning(f"Failed to get dynamic secret bytes: {e}")
+    
+    secret_key = get_dynamic_secret_key()
+    if secret_key == DEFAULT_SECRET_KEY:
+        return _DEFAULT_SECRET_KEY_BYTES
+    return bytes.fromhex(secret_key)
+
+
+def _try_fromhex(secret_key: str) -> Optional[bytes]:
+    """解码十六进制密钥, 非法时返回 None"""
+    try:
+        return bytes.fromhex(secret_key)
+    except ValueError:
+        return None
+
+
 def get_dynamic_fixed_ts() -> int:
     """
     获取动态 _ts 值
@@ -114,6 +156,9 @@ DEFAULT_HEADERS = {
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
 }
 
+# 预先规范化的请求头 (创建会话时 Headers(Headers) 只复制内部列表, 不再逐项编码)
+_DEFAULT_HEADERS_OBJ = Headers(DEFAULT_HEADERS)
+
 
 # ============================================================
 # Pydantic 模型定义
@@ -202,7 +247,11 @@ class PostDetailResponse(BaseModel):
 # 签名生成函数
 # ============================================================
 
-def generate_signature(data: str, timestamp: int, secret_key: Optional[str] = None) -> str:
+def generate_signature(
+    data: Union[str, bytes],
+    timestamp: int,
+    secret_key: Optional[Union[str, bytes]] = None
+) -> str:
     """
     生成 API 请求签名
     
@@ -212,9 +261,9 @@ def generate_signature(data: str, timestamp: int, secret_key: Optional[str] = No
     签名消息为: data_string + str(timestamp)
     
     Args:
-        data: 请求数据字符串 (JSON 或 URL)
+        data: 请求数据字符串 (JSON 或 URL), 也可直接传入 UTF-8 编码后的字节
         timestamp: 时间戳 (毫秒)
-        secret_key: 密钥十六进制字符串 (可选，不传则使用动态密钥)
+        secret_key: 密钥十六进制字符串或密钥字节 (可选，不传则使用动态密钥)
     
     Returns:
         64位十六进制签名字符串
@@ -224,36 +273,169 @@ def generate_signature(data: str, timestamp: int, secret_key: Optional[str] = No
         >>> len(sig)
         64
     """
-    # 如果未提供密钥，使用动态密钥
+    # 如果未提供密钥，使用动态密钥 (字节形式)
     if secret_key is None:
-        secret_key = get_dynamic_secret_key()
+        secret_key = get_dynamic_secret_key_bytes()
+    
+    # 直接在 bytes 上拼接签名消息: data + timestamp (不经过中间 str)
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    # int 用 C 层的 b'%d' 格式化; 其他类型与 f"{data}{timestamp}" 保持一致
+    message = data + (b'%d' % timestamp if type(timestamp) is int else str(timestamp).encode('utf-8'))
+    
+    # 计算 HMAC-SHA256 (密钥解码与 ipad/opad 预处理按密钥缓存)
+    return hmac_sha256_hex(message, secret_key)
+
+
+def generate_signatures_batch(
+    pairs: List[Tuple[str, int]],
+    secret_key: Optional[Union[str, bytes]] = None
+) -> List[str]:
+    """
+    批量生成 API 请求签名
     
-    # 将十六进制密钥转换为字节 (HMAC-SHA256 密钥)
-    key_bytes = bytes.fromhex(secret_key)
+    与逐条调用 generate_signature 结果相同, 但密钥只获取和预处理一次。
+    
+    Args:
+        pairs: (请求数据字符串, 时间戳) 列表
+        secret_key: 密钥十六进制字符串或密钥字节 (可选，不传则使用动态密钥)
     
-    # 拼接签名消息: data + timestamp
-    message = f"{data}{timestamp}"
+    Returns:
+        64位十六进制签名字符串列表, 与 pairs 顺序一致
+    
+    Example:
+        >>> sigs = generate_signatures_batch([('{"username":"a"}', 1768448262037),
+        ...                                   ('{"username":"b"}', 1768448262037)])
+        >>> len(sigs)
+        2
+    """
+    if secret_key is None:
+        secret_key = get_dynamic_secret_key_bytes()
     
-    # 计算 HMAC-SHA256
-    return hmac.new(key_bytes, message.encode('utf-8'), hashlib.sha256).hexdigest()
+    messages = [
+        data.encode('utf-8')
+        + (b'%d' % timestamp if type(timestamp) is int else str(timestamp).encode('utf-8'))
+        for data, timestamp in pairs
+    ]
+    return hmac_sha256_hex_batch(messages, secret_key)
 
 
 def get_current_timestamp() -> int:
     """获取当前时间戳(毫秒)"""
-    return int(time.time() * 1000)
+    return time.time_ns() // 1_000_000
 
 
 def sort_dict_keys(d: Dict[str, Any]) -> Dict[str, Any]:
     """
     按字母顺序排序字典的键
     
+    仅用于未知结构的请求数据。签名热路径 (用户信息 / 帖子列表) 的调用方
+    已按字母序构造字典并走模板序列化, 不会经过这里; 新增调用方也应预先排序。
+    
     Args:
         d: 输入字典
     
     Returns:
-        排序后的字典
+        排序后的字典 (单键及空字典直接原样返回)
+    """
+    if len(d) <= 1:
+        return d
+    return {k: d[k] for k in sorted(d)}
+
+
+# 已知请求结构的 JSON 模板 (键已按字母序排列, 与 sort_dict_keys + json.dumps 输出一致)
+_USER_TPL = '{{"username":{username}}}'
+_POSTS_TPL = '{{"maxId":{max_id},"username":{username}}}'
+
+
+# 可以直接套用模板的字段值类型; 其他类型 (list / dict 等) 走整体序列化
+_TEMPLATE_VALUE_TYPES = (str, int, bool, type(None))
+
+
+def _json_value(value: Any) -> str:
+    """序列化单个标量 JSON 值 (不转义 Unicode)"""
+    if orjson is not None and type(value) is str:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:
+            pass  # 孤立代理字符等 orjson 不支持的输入
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _serialize_payload_data(data_dict: Dict[str, Any]) -> str:
+    """
+    将请求数据序列化为签名用的紧凑 JSON 字符串
+    
+    用户信息 / 帖子列表两种固定结构 (字段值为标量时) 直接套用模板, 只对字段值做 JSON 转义;
+    其他结构只排序顶层键后整体序列化 (signature.serialize_sorted, 优先 orjson)。
+    
+    Args:
+        data_dict: 请求数据字典
+    
+    Returns:
+        键按字母序排列的紧凑 JSON 字符串
     """
-    return {k: d[k] for k in sorted(d.keys())}
+    size = len(data_dict)
+    if size == 1 and "username" in data_dict:
+        username = data_dict["username"]
+        if type(username) in _TEMPLATE_VALUE_TYPES:
+            return _USER_TPL.format(username=_json_value(username))
+    elif size == 2 and "username" in data_dict and "maxId" in data_dict:
+        username = data_dict["username"]
+        max_id = data_dict["maxId"]
+        if type(username) in _TEMPLATE_VALUE_TYPES and type(max_id) in _TEMPLATE_VALUE_TYPES:
+            return _POSTS_TPL.format(
+                max_id=_json_value(max_id),
+                username=_json_value(username)
+            )
+    return serialize_sorted(data_dict, nested=False)
+
+
+# ============================================================
+# 响应解析
+# ============================================================
+
+# InstagramUser 字段提取规则: (字段名, 主路径, 备用路径)
+# 主路径取值为假时再尝试备用路径, 与 `a or b` 语义一致
+_USER_FIELD_PATHS = (
+    ("id", ("id",), ("pk",)),
+    ("username", ("username",), None),
+    ("full_name", ("full_name",), None),
+    ("biography", ("biography",), None),
+    ("profile_pic_url", ("profile_pic_url",), None),
+    ("profile_pic_url_hd", ("profile_pic_url_hd",), ("hd_profile_pic_url_info", "url")),
+    ("follower_count", ("edge_followed_by", "count"), ("follower_count",)),
+    ("following_count", ("edge_follow", "count"), ("following_count",)),
+    ("media_count", ("edge_owner_to_timeline_media", "count"), ("media_count",)),
+    ("is_private", ("is_private",), None),
+    ("is_verified", ("is_verified",), None),
+    ("external_url", ("external_url",), None),
+)
+
+
+def _get_nested(data: Dict[str, Any], path: tuple) -> Any:
+    """
+    按路径读取嵌套字段, 任一层缺失返回 None
+    
+    用一次 try/except 代替 `.get(key, {}).get(...)` 链, 未命中时不分配临时空字典。
+    """
+    try:
+        for key in path:
+            data = data[key]
+        return data
+    except (KeyError, TypeError, IndexError):
+        return None
+
+
+def _extract_user(user: Dict[str, Any]) -> InstagramUser:
+    """从原始用户字典中提取 InstagramUser"""
+    fields = {}
+    for name, path, fallback in _USER_FIELD_PATHS:
+        value = _get_nested(user, path)
+        if not value and fallback is not None:
+            value = _get_nested(user, fallback)
+        fields[name] = value
+    return InstagramUser(**fields)
 
 
 # ============================================================
@@ -282,7 +464,8 @@ class InstagramAPIClient:
         self, 
         secret_key: Optional[str] = None,
         fixed_ts: Optional[int] = None,
-        timeout: float = 30.0
+        timeout: float = 30.0,
+        max_clients: int = DEFAULT_MAX_CLIENTS
     ):
         """
         初始化客户端
@@ -291,11 +474,16 @@ class InstagramAPIClient:
             secret_key: 签名密钥 (可选，不传则使用动态密钥)
             fixed_ts: 固定服务器时间戳 (可选，不传则使用动态值)
             timeout: 请求超时时间(秒)
+            max_clients: 底层会话的最大并发连接数
         """
         self._secret_key = secret_key  # 存储传入的密钥
+        self._secret_key_bytes = _try_fromhex(secret_key) if secret_key else None
         self._fixed_ts = fixed_ts  # 存储传入的 _ts
         self.timeout = timeout
+        self.max_clients = max_clients
         self._client: Optional[AsyncSession] = None
+        self._tail_prefix_ts: Optional[int] = None  # _signed_tail_prefix 对应的 _ts
+        self._tail_prefix = ""
     
     @property
     def secret_key(self) -> str:
@@ -304,6 +492,19 @@ class InstagramAPIClient:
             return self._secret_key
         return get_dynamic_secret_key()
     
+    @property
+    def secret_key_bytes(self) -> bytes:
+        """
+        获取当前有效密钥的字节形式 (签名热路径使用)
+        
+        传入的密钥不是合法十六进制时在此抛出 ValueError, 由各请求方法转为错误响应。
+        """
+        if self._secret_key_bytes:
+            return self._secret_key_bytes
+        if self._secret_key:
+            return bytes.fromhex(self._secret_key)
+        return get_dynamic_secret_key_bytes()
+    
     @property
     def fixed_ts(self) -> int:
         """获取当前有效的 _ts 值"""
@@ -313,27 +514,28 @@ class InstagramAPIClient:
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        # 使用 curl_cffi 模拟 Chrome 浏览器指纹
-        self._client = AsyncSession(
-            timeout=self.timeout,
-            headers=DEFAULT_HEADERS,
-            impersonate="chrome120"  # 模拟 Chrome 浏览器
-        )
+        self._get_client()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
+        await self.close()
+    
+    async def close(self):
+        """关闭底层 HTTP 会话"""
         if self._client:
             await self._client.close()
             self._client = None
     
     def _get_client(self) -> AsyncSession:
-        """获取 HTTP 客户端"""
+        """获取 HTTP 客户端 (首次调用时创建, 之后复用连接)"""
         if self._client is None:
+            # 使用 curl_cffi 模拟 Chrome 浏览器指纹
             self._client = AsyncSession(
                 timeout=self.timeout,
-                headers=DEFAULT_HEADERS,
-                impersonate="chrome120"
+                headers=_DEFAULT_HEADERS_OBJ,
+                impersonate="chrome120",  # 模拟 Chrome 浏览器
+                max_clients=self.max_clients  # 并发连接上限, 同源请求复用 HTTP/2 连接
             )
         return self._client
     
@@ -356,14 +558,11 @@ class InstagramAPIClient:
         """
         ts = timestamp or get_current_timestamp()
         
-        # 按字母顺序排序键
-        sorted_data = sort_dict_keys(data_dict)
-        
-        # 生成 JSON 字符串 (紧凑格式，不转义 Unicode)
-        data_string = json.dumps(sorted_data, separators=(',', ':'), ensure_ascii=False)
+        # 生成 JSON 字符串 (紧凑格式，键已排序，不转义 Unicode)
+        data_string = _serialize_payload_data(data_dict)
         
         # 生成签名
-        signature = generate_signature(data_string, ts, self.secret_key)
+        signature = generate_signature(data_string, ts, self.secret_key_bytes)
         
         # 构建完整请求体
         payload = {
@@ -377,6 +576,46 @@ class InstagramAPIClient:
         
         return payload
     
+    def _create_signed_body(
+        self,
+        data_dict: Dict[str, Any],
+        timestamp: Optional[int] = None
+    ) -> str:
+        """
+        创建带签名的 JSON 请求体 (已序列化)
+        
+        与 _create_signed_payload 字段一致, 但直接在签名用的 data_string 后
+        拼接签名字段, 省去合并字典和 curl_cffi 二次 JSON 序列化。
+        
+        Args:
+            data_dict: 请求数据字典
+            timestamp: 时间戳，不传则使用当前时间
+        
+        Returns:
+            JSON 字符串
+        """
+        ts = timestamp or get_current_timestamp()
+        
+        data_string = _serialize_payload_data(data_dict)
+        signature = generate_signature(data_string, ts, self.secret_key_bytes)
+        
+        # 去掉结尾的 "}" 后追加签名字段
+        separator = ',"ts":' if data_dict else '"ts":'
+        return data_string[:-1] + separator + str(ts) + self._signed_tail_prefix + signature + '"}'
+    
+    @property
+    def _signed_tail_prefix(self) -> str:
+        """
+        签名请求体的固定尾部 ',"_ts":...,"_tsc":0,"_sv":2,"_s":"'
+        
+        只在 _ts 变化 (密钥轮换) 时重新格式化。
+        """
+        fixed_ts = self.fixed_ts
+        if self._tail_prefix_ts != fixed_ts:
+            self._tail_prefix = f',"_ts":{fixed_ts},"_tsc":0,"_sv":2,"_s":"'
+            self._tail_prefix_ts = fixed_ts
+        return self._tail_prefix
+    
     def _create_signed_form(
         self,
         url: str,
@@ -397,7 +636,7 @@ class InstagramAPIClient:
         ts = timestamp or get_current_timestamp()
         
         # 生成签名 (直接使用 URL 作为数据)
-        signature = generate_signature(url, ts, self.secret_key)
+        signature = generate_signature(url, ts, self.secret_key_bytes)
         
         # 构建表单数据
         form_data = {
@@ -429,13 +668,14 @@ class InstagramAPIClient:
         try:
             client = self._get_client()
             
-            # 构建请求体
-            payload = self._create_signed_payload({"username": username})
+            # 构建请求体 (已序列化的 JSON)
+            body = self._create_signed_body({"username": username})
             
             # 发送请求
             response = await client.post(
                 f"{BASE_URL}/api/v1/instagram/userInfo",
-                json=payload
+                data=body.encode('utf-8'),
+                headers={"content-type": "application/json"}
             )
             
             response.raise_for_status()
@@ -469,20 +709,7 @@ class InstagramAPIClient:
                     user = data.get("user", {})
                 
                 if user and isinstance(user, dict):
-                    user_data = InstagramUser(
-                        id=user.get("id") or user.get("pk"),
-                        username=user.get("username"),
-                        full_name=user.get("full_name"),
-                        biography=user.get("biography"),
-                        profile_pic_url=user.get("profile_pic_url"),
-                        profile_pic_url_hd=user.get("profile_pic_url_hd") or user.get("hd_profile_pic_url_info", {}).get("url"),
-                        follower_count=user.get("edge_followed_by", {}).get("count") or user.get("follower_count"),
-                        following_count=user.get("edge_follow", {}).get("count") or user.get("following_count"),
-                        media_count=user.get("edge_owner_to_timeline_media", {}).get("count") or user.get("media_count"),
-                        is_private=user.get("is_private"),
-                        is_verified=user.get("is_verified"),
-                        external_url=user.get("external_url")
-                    )
+                    user_data = _extract_user(user)
             
             return UserInfoResponse(
                 success=True,
@@ -490,14 +717,18 @@ class InstagramAPIClient:
                 raw_response=data
             )
             
+        except HTTPError as e:
+            # raise_for_status 抛出的异常总是携带 response
+            response = e.response
+            return UserInfoResponse(
+                success=False,
+                error=f"HTTP {response.status_code}: {response.text}"
+            )
         except Exception as e:
-            # curl_cffi 异常处理
-            error_msg = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            # 连接/超时等 curl_cffi 异常及其他错误
             return UserInfoResponse(
                 success=False,
-                error=error_msg
+                error=str(e)
             )
     
     async def get_posts(
@@ -524,8 +755,8 @@ class InstagramAPIClient:
         try:
             client = self._get_client()
             
-            # 构建请求体
-            payload = self._create_signed_payload({
+            # 构建请求体 (已序列化的 JSON, 键已按字母序排列)
+            body = self._create_signed_body({
                 "maxId": max_id,
                 "username": username
             })
@@ -533,7 +764,8 @@ class InstagramAPIClient:
             # 发送请求
             response = await client.post(
                 f"{BASE_URL}/api/v1/instagram/postsV2",
-                json=payload
+                data=body.encode('utf-8'),
+                headers={"content-type": "application/json"}
             )
             
             response.raise_for_status()
@@ -577,13 +809,18 @@ class InstagramAPIClient:
                 raw_response=data
             )
             
+        except HTTPError as e:
+            # raise_for_status 抛出的异常总是携带 response
+            response = e.response
+            return PostsResponse(
+                success=False,
+                error=f"HTTP {response.status_code}: {response.text}"
+            )
         except Exception as e:
-            error_msg = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            # 连接/超时等 curl_cffi 异常及其他错误
             return PostsResponse(
                 success=False,
-                error=error_msg
+                error=str(e)
             )
     
     async def get_post_detail(self, url: str) -> PostDetailResponse:
@@ -623,13 +860,18 @@ class InstagramAPIClient:
                 raw_response=data
             )
             
+        except HTTPError as e:
+            # raise_for_status 抛出的异常总是携带 response
+            response = e.response
+            return PostDetailResponse(
+                success=False,
+                error=f"HTTP {response.status_code}: {response.text}"
+            )
         except Exception as e:
-            error_msg = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            # 连接/超时等 curl_cffi 异常及其他错误
             return PostDetailResponse(
                 success=False,
-                error=error_msg
+                error=str(e)
             )
 
 
@@ -637,6 +879,51 @@ class InstagramAPIClient:
 # 便捷函数
 # ============================================================
 
+# 进程级共享客户端 (复用 TLS 连接)
+_default_client: Optional[InstagramAPIClient] = None
+_default_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_default_client() -> InstagramAPIClient:
+    """
+    获取共享的默认客户端
+    
+    懒加载创建, 之后所有便捷函数复用同一个 AsyncSession, 避免每次请求
+    重新建立 TCP/TLS 连接。会话绑定事件循环, 循环变化时关闭旧客户端并重新创建。
+    
+    Returns:
+        InstagramAPIClient 实例
+    """
+    global _default_client, _default_client_loop
+    loop = asyncio.get_running_loop()
+    if _default_client is None or _default_client_loop is not loop:
+        stale_client = _default_client
+        # 先替换再关闭: 关闭期间的并发调用直接拿到新客户端
+        _default_client = InstagramAPIClient()
+        _default_client_loop = loop
+        if stale_client is not None:
+            await _close_stale_client(stale_client)
+    return _default_client
+
+
+async def _close_stale_client(client: InstagramAPIClient):
+    """关闭绑定在旧事件循环上的客户端, 无法正常关闭时至少丢弃其会话"""
+    try:
+        await client.close()
+    except Exception as e:
+        logger.debug(f"Failed to close stale client: {e}")
+        client._client = None
+
+
+async def close_default_client():
+    """关闭共享的默认客户端 (应用关闭时调用)"""
+    global _default_client, _default_client_loop
+    if _default_client is not None:
+        await _default_client.close()
+        _default_client = None
+        _default_client_loop = None
+
+
 async def get_instagram_user(username: str) -> UserInfoResponse:
     """
     便捷函数: 获取用户信息
@@ -647,8 +934,8 @@ async def get_instagram_user(username: str) -> UserInfoResponse:
     Returns:
         用户信息响应
     """
-    async with InstagramAPIClient() as client:
-        return await client.get_user_info(username)
+    client = await get_default_client()
+    return await client.get_user_info(username)
 
 
 async def get_instagram_posts(username: str, max_id: str = "") -> PostsResponse:
@@ -662,8 +949,8 @@ async def get_instagram_posts(username: str, max_id: str = "") -> PostsResponse:
     Returns:
         帖子列表响应
     """
-    async with InstagramAPIClient() as client:
-        return await client.get_posts(username, max_id)
+    client = await get_default_client()
+    return await client.get_posts(username, max_id)
 
 
 async def get_instagram_post_detail(url: str) -> PostDetailResponse:
@@ -676,8 +963,8 @@ async def get_instagram_post_detail(url: str) -> PostDetailResponse:
     Returns:
         帖子详情响应
     """
-    async with InstagramAPIClient() as client:
-        return await client.get_post_detail(url)
+    client = await get_default_client()
+    return await client.get_post_detail(url)
 
 
 # ============================================================
@@ -685,8 +972,6 @@ async def get_instagram_post_detail(url: str) -> PostDetailResponse:
 # ============================================================
 
 if __name__ == "__main__":
-    import asyncio
-    
     async def test():
         print("=" * 60)
         print("Instagram API 客户端测试")
@@ -12,19 +12,46 @@ JS 密钥提取模块
 
 import re
 import os
+import functools
 import subprocess
+import threading
 import tempfile
 import hashlib
 import json
+import logging
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, Union
 from datetime import datetime
 import asyncio
+import atexit
 
 import httpx
 
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    _HTTP2_AVAILABLE = True
+except ImportError:  # 可选依赖, 缺失时使用 HTTP/1.1
+    _HTTP2_AVAILABLE = False
+
+try:
+    import orjson
+except ImportError:  # 可选依赖, 缺失时使用标准库 json
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖, 缺失时逐字符转换 LZString 输入
+    np = None
+
+try:
+    from numba import njit
+except ImportError:  # 可选依赖, 缺失时使用纯 Python LZString 解压
+    njit = None
+
 from .secret_decoder import decode_secret_from_blob
 
+logger = logging.getLogger(__name__)
+
 
 # ==================== 配置 ====================
 
@@ -37,6 +64,9 @@ DEOBFUSCATOR_SCRIPT = "deobfuscator-v4.js"
 # 密钥缓存文件
 KEY_CACHE_FILE = "key_cache.json"
 
+# 记录到缓存中的 HTTP 校验头: (响应头名, 缓存键名)
+_VALIDATOR_HEADERS = (("etag", "etag"), ("last-modified", "last_modified"))
+
 # 提取加密数据的正则表达式模式
 # 模式1: 在反混淆后的代码中查找
 ENCRYPTED_DATA_PATTERN = r'=\s*"(0E6V[A-Za-z0-9+/=]{300,})"\s*;'
@@ -46,15 +76,35 @@ CUSTOM_ALPHABET_PATTERN = r'=\s*"([A-Za-z0-9+/]{64})"\s*;'
 PAIR_PATTERN = r'"(0E6V[A-Za-z0-9+/=]{300,})"[^"]*"([A-Za-z0-9+/]{64})"'
 
 # v4 反混淆输出专用模式 (基于 decodeSecretFromBlob 锚点)
-# 加密 blob: 200+ 字符的 base64-like 字符串
-V4_BLOB_PATTERN = r'=\s*"([A-Za-z0-9+/]{200,})"'
+# 加密 blob: 200+ 字符的 base64-like 字符串 (设上限, 并要求其后是语句/参数结束符)
+V4_BLOB_PATTERN = r'=\s*"([A-Za-z0-9+/]{200,4096})"(?=\s*[;,)])'
 # 自定义字母表: 恰好 64 字符的 base64 字母表
 V4_ALPHABET_PATTERN = r'=\s*"([A-Za-z0-9+/]{64})"'
 # 密钥片段数组: ["xxx", "yyy", "zzz"] (2-5 字符的短字符串)
-V4_KEY_PARTS_PATTERN = r'=\s*\["([a-z0-9]{2,5})",\s*"([a-z0-9]{2,5})",\s*"([a-z0-9]{2,5})"\]'
+V4_KEY_PARTS_PATTERN = r'=\s*\[\s*"([a-z0-9]{2,5})"\s*,\s*"([a-z0-9]{2,5})"\s*,\s*"([a-z0-9]{2,5})"\s*\]'
 # 索引数组: [n, n, n] (0-2 的排列)
 V4_INDEX_PATTERN = r'=\s*\[(\d),\s*(\d),\s*(\d)\]'
 
+# 预编译的正则表达式 (模块加载时编译一次)
+_ENCRYPTED_RE = re.compile(ENCRYPTED_DATA_PATTERN)
+_ALPHABET_RE = re.compile(CUSTOM_ALPHABET_PATTERN)
+_PAIR_RE = re.compile(PAIR_PATTERN)
+_V4_BLOB_RE = re.compile(V4_BLOB_PATTERN)
+_V4_ALPHA_RE = re.compile(V4_ALPHABET_PATTERN)
+_V4_KEY_PARTS_RE = re.compile(V4_KEY_PARTS_PATTERN)
+_V4_IDX_RE = re.compile(V4_INDEX_PATTERN)
+# v4 单趟扫描: 四个模式合并为一个交替式, 按 lastgroup 区分命中类型
+# (四个模式都以 "=" 开头且匹配内部不含 "=", 同一位置至多一个模式命中, 因此不会漏掉任何命中)
+_V4_SCAN_RE = re.compile(
+    f"(?P<blob>{V4_BLOB_PATTERN})|(?P<alpha>{V4_ALPHABET_PATTERN})"
+    f"|(?P<parts>{V4_KEY_PARTS_PATTERN})|(?P<idx>{V4_INDEX_PATTERN})"
+)
+# LZString 压缩常量串 (展开循环写法匹配可含转义的字符串字面量, 线性时间, 不再依赖 .+? 逐字符回溯)
+_LZ_CAPTURE_RE = re.compile(r'var LcSqQ8\s*=\s*"([^"\\]*(?:\\.[^"\\]*)*)"\s*,\s*Cn7qVG', re.DOTALL)
+# 特定变量赋值 (加密数据) 及其后紧跟的 64 字符字母表
+_SPECIFIC_RE = re.compile(r'[a-zA-Z_$][a-zA-Z0-9_$]*\s*=\s*"(0E6V[A-Za-z0-9+/=]{300,})"')
+_QUOTED_ALPHABET_RE = re.compile(r'"([A-Za-z0-9+/]{64})"')
+
 
 # ==================== 工具函数 ====================
 
@@ -68,13 +118,167 @@ def get_cache_path() -> Path:
     return get_project_root() / "app" / KEY_CACHE_FILE
 
 
-def calculate_js_hash(content: str) -> str:
-    """计算 JS 内容的 MD5 哈希"""
-    return hashlib.md5(content.encode()).hexdigest()
+def calculate_js_hash(content: Union[str, bytes]) -> str:
+    """
+    计算 JS 内容的 MD5 哈希
+    
+    优先传入下载得到的原始字节, 避免对整个文件再做一次 UTF-8 编码。
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    return hashlib.md5(content).hexdigest()
 
 
 # ==================== JS 下载 ====================
 
+# 进程级共享 HTTP 客户端 (复用 TCP/TLS 连接, 支持时启用 HTTP/2)
+_CLIENT: Optional[httpx.AsyncClient] = None
+_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_SYNC_CLIENT: Optional[httpx.Client] = None
+
+# 共享客户端的连接池设置
+_CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=4)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    获取共享的异步 HTTP 客户端
+    
+    客户端绑定事件循环, 循环变化时 (例如调用方多次 asyncio.run) 释放旧客户端并重新创建。
+    """
+    global _CLIENT, _CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _CLIENT is None or _CLIENT_LOOP is not loop:
+        if _CLIENT is not None:
+            _release_stale_client(_CLIENT, _CLIENT_LOOP)
+        _CLIENT = httpx.AsyncClient(http2=_HTTP2_AVAILABLE, timeout=30.0, limits=_CLIENT_LIMITS)
+        _CLIENT_LOOP = loop
+    return _CLIENT
+
+
+def _release_stale_client(client: httpx.AsyncClient, client_loop: Optional[asyncio.AbstractEventLoop]):
+    """
+    释放绑定在旧事件循环上的异步客户端
+    
+    旧循环仍在 (其他线程中) 运行时在该循环上关闭客户端; 旧循环已结束时连接
+    无法再经由它关闭 (aclose 会抛出 "Event loop is closed"), 只能丢弃引用,
+    由对象回收释放 socket。
+    """
+    if client_loop is not None and client_loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+
+
+def _get_sync_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端"""
+    global _SYNC_CLIENT
+    if _SYNC_CLIENT is None:
+        _SYNC_CLIENT = httpx.Client(http2=_HTTP2_AVAILABLE, timeout=30.0, limits=_CLIENT_LIMITS)
+    return _SYNC_CLIENT
+
+
+async def close_http_clients():
+    """关闭共享的 HTTP 客户端 (应用关闭时调用)"""
+    global _CLIENT, _CLIENT_LOOP, _SYNC_CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+        _CLIENT_LOOP = None
+    if _SYNC_CLIENT is not None:
+        _SYNC_CLIENT.close()
+        _SYNC_CLIENT = None
+
+
+@atexit.register
+def _close_sync_client():
+    """进程退出时关闭同步客户端"""
+    if _SYNC_CLIENT is not None:
+        _SYNC_CLIENT.close()
+
+
+def _build_js_url(url: str, ch_param: Optional[str] = None) -> str:
+    """拼接带 ch 参数的 JS 文件 URL"""
+    if ch_param:
+        return f"{url}?ch={ch_param}"
+    return url
+
+
+def _response_validators(response: httpx.Response) -> Dict[str, str]:
+    """提取响应中的缓存校验头, 返回 {"etag": ..., "last_modified": ...} (仅含存在的项)"""
+    validators = {}
+    for header, key in _VALIDATOR_HEADERS:
+        value = response.headers.get(header)
+        if value:
+            validators[key] = value
+    return validators
+
+
+def _validators_match(cached: Dict[str, Any], validators: Dict[str, str]) -> bool:
+    """比较缓存与服务器的校验头 (ETag 优先, 其次 Last-Modified)"""
+    if cached.get("etag") and validators.get("etag"):
+        return cached["etag"] == validators["etag"]
+    if cached.get("last_modified") and validators.get("last_modified"):
+        return cached["last_modified"] == validators["last_modified"]
+    return False
+
+
+async def download_js_with_validators(
+    url: str,
+    ch_param: Optional[str] = None
+) -> Tuple[bytes, Dict[str, str]]:
+    """
+    下载远程 JS 文件 (原始字节), 同时返回缓存校验头
+    
+    Args:
+        url: JS 文件 URL
+        ch_param: 可选的 ch 参数 (如 "2fcb0a2062d7bec7.js")
+    
+    Returns:
+        (JS 文件原始字节, {"etag": ..., "last_modified": ...})
+    
+    Raises:
+        httpx.HTTPError: 网络请求失败
+    """
+    response = await _get_client().get(_build_js_url(url, ch_param), follow_redirects=True)
+    response.raise_for_status()
+    return response.content, _response_validators(response)
+
+
+async def download_js_bytes(url: str, ch_param: Optional[str] = None) -> bytes:
+    """
+    下载远程 JS 文件 (原始字节)
+    
+    用于计算哈希: 直接对响应字节做 MD5, 不经过解码/重新编码。
+    
+    Args:
+        url: JS 文件 URL
+        ch_param: 可选的 ch 参数 (如 "2fcb0a2062d7bec7.js")
+    
+    Returns:
+        JS 文件原始字节
+    
+    Raises:
+        httpx.HTTPError: 网络请求失败
+    """
+    content, _ = await download_js_with_validators(url, ch_param)
+    return content
+
+
+def download_js_with_validators_sync(
+    url: str,
+    ch_param: Optional[str] = None
+) -> Tuple[bytes, Dict[str, str]]:
+    """同步版本的 download_js_with_validators"""
+    response = _get_sync_client().get(_build_js_url(url, ch_param), follow_redirects=True)
+    response.raise_for_status()
+    return response.content, _response_validators(response)
+
+
+def download_js_bytes_sync(url: str, ch_param: Optional[str] = None) -> bytes:
+    """同步版本的 JS 原始字节下载函数"""
+    content, _ = download_js_with_validators_sync(url, ch_param)
+    return content
+
+
 async def download_js_file(url: str, ch_param: Optional[str] = None) -> str:
     """
     下载远程 JS 文件
@@ -89,36 +293,195 @@ async def download_js_file(url: str, ch_param: Optional[str] = None) -> str:
     Raises:
         httpx.HTTPError: 网络请求失败
     """
-    if ch_param:
-        full_url = f"{url}?ch={ch_param}"
-    else:
-        full_url = url
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(full_url, follow_redirects=True)
-        response.raise_for_status()
-        return response.text
+    response = await _get_client().get(_build_js_url(url, ch_param), follow_redirects=True)
+    response.raise_for_status()
+    return response.text
 
 
 def download_js_file_sync(url: str, ch_param: Optional[str] = None) -> str:
     """同步版本的 JS 下载函数"""
-    if ch_param:
-        full_url = f"{url}?ch={ch_param}"
-    else:
-        full_url = url
-    
-    with httpx.Client(timeout=30.0) as client:
-        response = client.get(full_url, follow_redirects=True)
-        response.raise_for_status()
-        return response.text
+    response = _get_sync_client().get(_build_js_url(url, ch_param), follow_redirects=True)
+    response.raise_for_status()
+    return response.text
 
 
 # ==================== JS 解混淆 ====================
 
+# 临时文件目录: Linux 上优先使用 /dev/shm (tmpfs), 否则使用系统默认临时目录
+_TMPFS_DIR = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+
+def _run_deobfuscator_in(work_dir: Path, js_content: str, deobfuscator_path: Path) -> str:
+    """在 work_dir 中写入输入文件、运行 deobfuscator 并读取输出"""
+    input_file = work_dir / "input.js"
+    output_file = work_dir / "input_deobfuscated_v4.js"
+    
+    # 写入输入文件
+    input_file.write_text(js_content, encoding='utf-8')
+    
+    # 运行 deobfuscator
+    # 使用 UTF-8 编码避免 Windows GBK 编码问题
+    result = subprocess.run(
+        ["node", str(deobfuscator_path), str(input_file)],
+        cwd=str(deobfuscator_path.parent),
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        errors='replace',  # 替换无法解码的字符
+        timeout=120
+    )
+    
+    if result.returncode != 0:
+        raise RuntimeError(f"Deobfuscator failed: {result.stderr}")
+    
+    # 读取输出
+    if not output_file.exists():
+        # 尝试其他可能的输出文件名
+        possible_outputs = list(work_dir.glob("*_deobfuscated*.js"))
+        if possible_outputs:
+            output_file = possible_outputs[0]
+        else:
+            raise RuntimeError("Deobfuscator output file not found")
+    
+    return output_file.read_text(encoding='utf-8')
+
+
+class DeobfuscatorDaemonError(RuntimeError):
+    """常驻 deobfuscator 进程不可用 (启动失败或中途退出)"""
+
+
+class DeobfuscatorDaemon:
+    """
+    常驻的 Node.js deobfuscator 进程 (node deobfuscator-v4.js --server)
+    
+    首次使用时启动, 之后所有请求通过 stdin/stdout 管道复用同一进程,
+    省去每次调用的 Node 启动和 V8 预热。请求之间用锁串行化。
+    
+    协议 (长度均为 4 字节大端):
+        请求: [长度][UTF-8 源码]
+        响应: [状态 1 字节: 0 成功 / 1 失败][长度][UTF-8 结果或错误信息]
+    """
+    
+    def __init__(self, script_path: Path, timeout: float = 120):
+        self.script_path = script_path
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+    
+    def _ensure_process(self) -> subprocess.Popen:
+        """启动 (或重启已退出的) Node 进程"""
+        if self._process is None or self._process.poll() is not None:
+            try:
+                self._process = subprocess.Popen(
+                    ["node", str(self.script_path), "--server"],
+                    cwd=str(self.script_path.parent),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,  # 服务模式下日志写到 stderr, 直接丢弃
+                )
+            except OSError as e:
+                self._process = None
+                raise DeobfuscatorDaemonError(f"Failed to start deobfuscator daemon: {e}") from e
+        return self._process
+    
+    @staticmethod
+    def _read_exact(stream, n: int) -> bytes:
+        """从管道读取恰好 n 字节, 进程退出导致数据不足时抛出异常"""
+        data = stream.read(n)
+        if data is None or len(data) < n:
+            raise DeobfuscatorDaemonError("Deobfuscator daemon exited unexpectedly")
+        return data
+    
+    def deobfuscate(self, js_content: str) -> str:
+        """
+        解混淆 JS 代码
+        
+        Args:
+            js_content: 原始 JS 代码
+        
+        Returns:
+            解混淆后的 JS 代码
+        
+        Raises:
+            DeobfuscatorDaemonError: 进程启动失败或中途退出
+            subprocess.TimeoutExpired: 处理超时
+            RuntimeError: deobfuscator 处理失败
+        """
+        payload = js_content.encode('utf-8')
+        
+        with self._lock:
+            process = self._ensure_process()
+            # 超时后杀掉进程, 阻塞中的读取随即返回不足的数据
+            timed_out = threading.Event()
+            
+            def on_timeout():
+                timed_out.set()
+                process.kill()
+            
+            watchdog = threading.Timer(self.timeout, on_timeout)
+            watchdog.start()
+            try:
+                process.stdin.write(len(payload).to_bytes(4, 'big') + payload)
+                process.stdin.flush()
+                
+                header = self._read_exact(process.stdout, 5)
+                length = int.from_bytes(header[1:], 'big')
+                body = self._read_exact(process.stdout, length)
+            except (OSError, DeobfuscatorDaemonError) as e:
+                self.close()
+                if timed_out.is_set():
+                    # 与一次性运行的超时行为一致, 不再回退重试
+                    raise subprocess.TimeoutExpired(process.args, self.timeout) from e
+                raise DeobfuscatorDaemonError(f"Deobfuscator daemon failed: {e}") from e
+            finally:
+                watchdog.cancel()
+        
+        if header[0] != 0:
+            raise RuntimeError(f"Deobfuscator failed: {body.decode('utf-8', errors='replace')}")
+        return body.decode('utf-8')
+    
+    def close(self):
+        """停止 Node 进程"""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+
+
+_daemon: Optional[DeobfuscatorDaemon] = None
+_daemon_lock = threading.Lock()
+
+
+def get_deobfuscator_daemon(script_path: Path) -> DeobfuscatorDaemon:
+    """获取 (懒加载创建) 全局 deobfuscator 常驻进程"""
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None or _daemon.script_path != script_path:
+            if _daemon is not None:
+                _daemon.close()
+            _daemon = DeobfuscatorDaemon(script_path)
+        return _daemon
+
+
+@atexit.register
+def _close_daemon():
+    """进程退出时停止常驻 deobfuscator"""
+    if _daemon is not None:
+        _daemon.close()
+
+
 def run_deobfuscator(js_content: str, output_dir: Optional[Path] = None) -> str:
     """
     使用 Node.js deobfuscator 解混淆 JS 代码
     
+    未指定 output_dir 时优先交给常驻 Node 进程处理 (见 DeobfuscatorDaemon);
+    常驻进程不可用时回退到一次性运行: 使用临时目录 (Linux 上优先放在 /dev/shm
+    内存文件系统, 避免磁盘读写), 结束后自动清理。
+    指定 output_dir 时一次性运行, 并保留输入和输出文件。
+    
     Args:
         js_content: 原始 JS 代码
         output_dir: 输出目录 (默认使用临时目录)
@@ -135,58 +498,75 @@ def run_deobfuscator(js_content: str, output_dir: Optional[Path] = None) -> str:
     if not deobfuscator_path.exists():
         raise FileNotFoundError(f"Deobfuscator not found: {deobfuscator_path}")
     
-    # 使用临时目录
-    if output_dir is None:
-        output_dir = Path(tempfile.mkdtemp())
-    
-    input_file = output_dir / "input.js"
-    output_file = output_dir / "input_deobfuscated_v4.js"
-    
-    # 写入输入文件
-    input_file.write_text(js_content, encoding='utf-8')
+    if output_dir is not None:
+        return _run_deobfuscator_in(Path(output_dir), js_content, deobfuscator_path)
     
     try:
-        # 运行 deobfuscator
-        # 使用 UTF-8 编码避免 Windows GBK 编码问题
-        result = subprocess.run(
-            ["node", str(deobfuscator_path), str(input_file)],
-            cwd=str(project_root),
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace',  # 替换无法解码的字符
-            timeout=120
-        )
-        
-        if result.returncode != 0:
-            raise RuntimeError(f"Deobfuscator failed: {result.stderr}")
-        
-        # 读取输出
-        if not output_file.exists():
-            # 尝试其他可能的输出文件名
-            possible_outputs = list(output_dir.glob("*_deobfuscated*.js"))
-            if possible_outputs:
-                output_file = possible_outputs[0]
-            else:
-                raise RuntimeError("Deobfuscator output file not found")
-        
-        return output_file.read_text(encoding='utf-8')
-        
-    finally:
-        # 清理临时文件
-        if output_dir and output_dir.exists():
-            import shutil
-            try:
-                shutil.rmtree(output_dir)
-            except:
-                pass
+        return get_deobfuscator_daemon(deobfuscator_path).deobfuscate(js_content)
+    except DeobfuscatorDaemonError as e:
+        logger.warning(f"{e}, falling back to one-shot deobfuscator")
+    
+    with tempfile.TemporaryDirectory(dir=_TMPFS_DIR) as work_dir:
+        return _run_deobfuscator_in(Path(work_dir), js_content, deobfuscator_path)
 
 
 # ==================== LZString 解压 ====================
 
-def lz_decompress_from_utf16(input_str: str) -> Optional[str]:
+# UTF16 编码中每个字符携带 15 位有效数据
+_LZ_BITS_PER_CHAR = 15
+
+# 2 ** n 查表 (numBits 单调增长, 实际输入中不超过 ~16)
+_POW2 = tuple(1 << n for n in range(32))
+
+
+@functools.lru_cache(maxsize=1)
+def _lz_reverse_table() -> Tuple[int, ...]:
+    """15 位反转表: LZString 按高位在前写入, 但按低位在前组装数值"""
+    return tuple(int(format(i, '015b')[::-1], 2) for i in range(1 << _LZ_BITS_PER_CHAR))
+
+
+class BitReader:
     """
-    LZString decompressFromUTF16 的 Python 实现
+    LZString UTF16 位流读取器
+    
+    每个字符的 15 位先做位反转, 再依次拼接到一个小窗口整数的高位,
+    read(n) 只需一次掩码和移位, 代替逐位的 val & position 循环。
+    超出输入末尾的位按 0 处理 (与 JS 实现一致)。
+    """
+    
+    __slots__ = ('_codes', '_index', '_buf', '_bits', 'pos', 'total')
+    
+    def __init__(self, input_str: str):
+        if np is not None:
+            # 整串一次性向量化转换, 避免逐字符 ord() 的解释器开销
+            self._codes = _lz_codes_array(input_str).tolist()
+        else:
+            rev = _lz_reverse_table()
+            self._codes = [rev[(ord(ch) - 32) & 0x7FFF] for ch in input_str]
+        self._index = 0
+        self._buf = 0
+        self._bits = 0
+        self.pos = 0
+        self.total = len(self._codes) * _LZ_BITS_PER_CHAR
+    
+    def read(self, n: int) -> int:
+        """读取 n 位 (先读到的位为最低位)"""
+        while self._bits < n:
+            if self._index < len(self._codes):
+                self._buf |= self._codes[self._index] << self._bits
+                self._index += 1
+            self._bits += _LZ_BITS_PER_CHAR
+        
+        value = self._buf & ((1 << n) - 1)
+        self._buf >>= n
+        self._bits -= n
+        self.pos += n
+        return value
+
+
+def _lz_decompress_py(input_str: str) -> Optional[str]:
+    """
+    LZString decompressFromUTF16 的纯 Python 实现
     
     Args:
         input_str: UTF16 压缩的字符串
@@ -197,157 +577,63 @@ def lz_decompress_from_utf16(input_str: str) -> Optional[str]:
     if not input_str:
         return ""
     
-    dictionary = {}
+    # 字典键是连续的小整数 0..dictSize-1, 直接用列表按下标存取
+    # (0-2 为控制码占位, 永远不会作为条目读取)
+    dictionary = [0, 1, 2]
     enlargeIn = 4
-    dictSize = 4
     numBits = 3
     result = []
     
-    data = {
-        'val': ord(input_str[0]) - 32,
-        'position': 16384,
-        'index': 1
-    }
+    reader = BitReader(input_str)
     
-    for i in range(3):
-        dictionary[i] = i
-    
-    # 读取前两位确定第一个字符的类型
-    bits = 0
-    maxpower = 4
-    power = 1
-    
-    while power != maxpower:
-        resb = data['val'] & data['position']
-        data['position'] >>= 1
-        if data['position'] == 0:
-            data['position'] = 16384
-            if data['index'] < len(input_str):
-                data['val'] = ord(input_str[data['index']]) - 32
-                data['index'] += 1
-            else:
-                data['val'] = 0
-        bits |= (1 if resb > 0 else 0) * power
-        power <<= 1
-    
-    if bits == 0:
-        bits = 0
-        maxpower = 256
-        power = 1
-        while power != maxpower:
-            resb = data['val'] & data['position']
-            data['position'] >>= 1
-            if data['position'] == 0:
-                data['position'] = 16384
-                if data['index'] < len(input_str):
-                    data['val'] = ord(input_str[data['index']]) - 32
-                    data['index'] += 1
-            bits |= (1 if resb > 0 else 0) * power
-            power <<= 1
-        c = chr(bits)
-    elif bits == 1:
-        bits = 0
-        maxpower = 65536
-        power = 1
-        while power != maxpower:
-            resb = data['val'] & data['position']
-            data['position'] >>= 1
-            if data['position'] == 0:
-                data['position'] = 16384
-                if data['index'] < len(input_str):
-                    data['val'] = ord(input_str[data['index']]) - 32
-                    data['index'] += 1
-            bits |= (1 if resb > 0 else 0) * power
-            power <<= 1
-        c = chr(bits)
+    read = reader.read
+    
+    # 读取前两位确定第一个字符的类型 (0: 8 位字符, 1: 16 位字符, 2: 结束)
+    bits = read(2)
+    
+    if bits == 0 or bits == 1:
+        c = chr(read(8 if bits == 0 else 16))
     elif bits == 2:
         return ""
     
-    dictionary[3] = c
+    dictionary.append(c)
     w = c
     result.append(c)
     
     while True:
-        if data['index'] > len(input_str):
+        # 输入已耗尽但未遇到结束标记: 数据被截断
+        if reader.pos >= reader.total:
             return ""
         
-        bits = 0
-        maxpower = 2 ** numBits
-        power = 1
-        
-        while power != maxpower:
-            resb = data['val'] & data['position']
-            data['position'] >>= 1
-            if data['position'] == 0:
-                data['position'] = 16384
-                if data['index'] < len(input_str):
-                    data['val'] = ord(input_str[data['index']]) - 32
-                    data['index'] += 1
-                else:
-                    data['val'] = 0
-            bits |= (1 if resb > 0 else 0) * power
-            power <<= 1
-        
-        c = bits
-        
-        if c == 0:
-            bits = 0
-            maxpower = 256
-            power = 1
-            while power != maxpower:
-                resb = data['val'] & data['position']
-                data['position'] >>= 1
-                if data['position'] == 0:
-                    data['position'] = 16384
-                    if data['index'] < len(input_str):
-                        data['val'] = ord(input_str[data['index']]) - 32
-                        data['index'] += 1
-                bits |= (1 if resb > 0 else 0) * power
-                power <<= 1
-            dictionary[dictSize] = chr(bits)
-            dictSize += 1
-            c = dictSize - 1
-            enlargeIn -= 1
-        elif c == 1:
-            bits = 0
-            maxpower = 65536
-            power = 1
-            while power != maxpower:
-                resb = data['val'] & data['position']
-                data['position'] >>= 1
-                if data['position'] == 0:
-                    data['position'] = 16384
-                    if data['index'] < len(input_str):
-                        data['val'] = ord(input_str[data['index']]) - 32
-                        data['index'] += 1
-                bits |= (1 if resb > 0 else 0) * power
-                power <<= 1
-            dictionary[dictSize] = chr(bits)
-            dictSize += 1
-            c = dictSize - 1
+        c = read(numBits)
+        
+        if c == 0 or c == 1:
+            # 字面量字符: 0 为 8 位, 1 为 16 位
+            literal = chr(read(8 if c == 0 else 16))
+            c = len(dictionary)
+            dictionary.append(literal)
             enlargeIn -= 1
         elif c == 2:
             return "".join(result)
         
         if enlargeIn == 0:
-            enlargeIn = 2 ** numBits
+            enlargeIn = _POW2[numBits]
             numBits += 1
         
-        if c in dictionary:
+        dictSize = len(dictionary)
+        if c < dictSize:
             entry = dictionary[c]
+        elif c == dictSize:
+            entry = w + w[0]
         else:
-            if c == dictSize:
-                entry = w + w[0]
-            else:
-                return None
+            return None
         
         result.append(entry)
-        dictionary[dictSize] = w + entry[0]
-        dictSize += 1
+        dictionary.append(w + entry[0])
         enlargeIn -= 1
         
         if enlargeIn == 0:
-            enlargeIn = 2 ** numBits
+            enlargeIn = _POW2[numBits]
             numBits += 1
         
         w = entry
@@ -355,9 +641,178 @@ def lz_decompress_from_utf16(input_str: str) -> Optional[str]:
     return "".join(result)
 
 
+@functools.lru_cache(maxsize=1)
+def _lz_reverse_array() -> "np.ndarray":
+    """_lz_reverse_table 的 numpy 版本 (供编译内核查表)"""
+    return np.asarray(_lz_reverse_table(), dtype=np.int64)
+
+
+def _lz_codes_array(input_str: str) -> "np.ndarray":
+    """
+    将 LZString UTF16 输入整串转换为 15 位码 (已做位反转)
+    
+    每个字符 -32 后查反转表, 全部在 numpy 中完成。
+    按 UTF-32 编码取码元, 孤立代理项原样保留 (与 ord() 一致)。
+    """
+    raw = np.frombuffer(input_str.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    return _lz_reverse_array()[(raw.astype(np.int64) - 32) & 0x7FFF]
+
+
+# 解压内核返回的状态码
+_LZ_OK = 0
+_LZ_EMPTY = 1
+_LZ_INVALID = 2
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _lz_read(codes, state, n):
+        """从位流读取 n 位; state = [窗口, 窗口位数, 下一个字符下标, 已读位数]"""
+        while state[1] < n:
+            if state[2] < codes.shape[0]:
+                state[0] |= codes[state[2]] << state[1]
+                state[2] += 1
+            state[1] += 15
+        value = state[0] & ((1 << n) - 1)
+        state[0] >>= n
+        state[1] -= n
+        state[3] += n
+        return value
+    
+    @njit(cache=True, boundscheck=False)
+    def _lz_core(codes):
+        """
+        LZString UTF16 解压内核
+        
+        字典条目不存字符串, 只存 (起点, 长度) 指向输出缓冲区:
+        新条目 w + entry[0] 恰好是输出中紧邻的 len(w) + 1 个码元。
+        
+        Args:
+            codes: 每个输入字符的 15 位数据 (已做位反转)
+        
+        Returns:
+            (输出码元数组, 有效长度, 状态码)
+        """
+        total = codes.shape[0] * 15
+        state = np.zeros(4, np.int64)
+        
+        out = np.empty(max(16, codes.shape[0] * 4), np.int32)
+        dict_start = np.empty(256, np.int64)
+        dict_len = np.empty(256, np.int64)
+        
+        bits = _lz_read(codes, state, 2)
+        if bits == 0:
+            out[0] = _lz_read(codes, state, 8)
+        elif bits == 1:
+            out[0] = _lz_read(codes, state, 16)
+        else:
+            return out, 0, _LZ_EMPTY if bits == 2 else _LZ_INVALID
+        
+        dict_start[3] = 0
+        dict_len[3] = 1
+        dict_size = 4
+        enlarge_in = 4
+        num_bits = 3
+        w_start = 0
+        w_len = 1
+        out_len = 1
+        
+        while True:
+            if state[3] >= total:
+                return out, 0, _LZ_EMPTY
+            
+            # 每轮最多新增两个字典条目
+            if dict_size + 2 > dict_start.shape[0]:
+                grown_start = np.empty(dict_start.shape[0] * 2, np.int64)
+                grown_len = np.empty(dict_start.shape[0] * 2, np.int64)
+                grown_start[:dict_size] = dict_start[:dict_size]
+                grown_len[:dict_size] = dict_len[:dict_size]
+                dict_start = grown_start
+                dict_len = grown_len
+            
+            c = _lz_read(codes, state, num_bits)
+            literal = -1
+            
+            if c == 0 or c == 1:
+                literal = _lz_read(codes, state, 8 if c == 0 else 16)
+                c = dict_size
+                dict_start[c] = out_len
+                dict_len[c] = 1
+                dict_size += 1
+                enlarge_in -= 1
+            elif c == 2:
+                return out, out_len, _LZ_OK
+            
+            if enlarge_in == 0:
+                enlarge_in = 1 << num_bits
+                num_bits += 1
+            
+            if c < dict_size:
+                entry_start = dict_start[c]
+                entry_len = dict_len[c]
+            elif c == dict_size:
+                entry_start = w_start
+                entry_len = w_len + 1
+            else:
+                return out, 0, _LZ_INVALID
+            
+            # 输出缓冲区按需扩容
+            if out_len + entry_len > out.shape[0]:
+                grown = np.empty(max(out.shape[0] * 2, out_len + entry_len), np.int32)
+                grown[:out_len] = out[:out_len]
+                out = grown
+            
+            if literal >= 0:
+                out[out_len] = literal
+            else:
+                # 逐个码元正向复制 (c == dict_size 时源与目标重叠, 正向复制恰好正确)
+                for i in range(entry_len):
+                    out[out_len + i] = out[entry_start + i]
+            
+            dict_start[dict_size] = w_start
+            dict_len[dict_size] = w_len + 1
+            dict_size += 1
+            enlarge_in -= 1
+            
+            if enlarge_in == 0:
+                enlarge_in = 1 << num_bits
+                num_bits += 1
+            
+            w_start = out_len
+            w_len = entry_len
+            out_len += entry_len
+
+
+def lz_decompress_from_utf16(input_str: str) -> Optional[str]:
+    """
+    LZString decompressFromUTF16
+    
+    安装了 numba 时使用编译内核, 否则使用纯 Python 实现。
+    
+    Args:
+        input_str: UTF16 压缩的字符串
+    
+    Returns:
+        解压后的字符串，失败返回 None
+    """
+    if not input_str:
+        return ""
+    
+    if njit is None:
+        return _lz_decompress_py(input_str)
+    
+    out, out_len, status = _lz_core(_lz_codes_array(input_str))
+    if status == _LZ_EMPTY:
+        return ""
+    if status == _LZ_INVALID:
+        return None
+    # 码元逐个转为字符 (与纯 Python 实现一致, 不合并代理对)
+    return out[:out_len].astype(np.uint32).tobytes().decode('utf-32-le', 'surrogatepass')
+
+
 # ==================== 密钥提取 (v4 反混淆输出) ====================
 
-def extract_from_v4_output(content: str) -> Optional[Dict[str, Any]]:
+def extract_from_v4_output(content: str, anchor_idx: Optional[int] = None) -> Optional[Dict[str, Any]]:
     """
     从 v4 反混淆输出中提取所有密钥数据
     
@@ -369,43 +824,69 @@ def extract_from_v4_output(content: str) -> Optional[Dict[str, Any]]:
     
     Args:
         content: v4 反混淆后的 JS 代码
+        anchor_idx: 已知的 decodeSecretFromBlob 位置 (可选, 省去再次 rfind 整个文件)
     
     Returns:
         包含 encrypted_data, custom_alphabet, fixed_ts 的字典，失败返回 None
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     # 以 decodeSecretFromBlob 为锚点 (使用最后一次出现，即实际使用位置)
-    anchor_idx = content.rfind('decodeSecretFromBlob')
+    if anchor_idx is None:
+        anchor_idx = content.rfind('decodeSecretFromBlob')
     if anchor_idx < 0:
         logger.debug("v4 extraction: decodeSecretFromBlob not found")
         return None
     
-    # 在锚点前 3000 字符范围内搜索
+    # 在锚点前 3000 字符范围内搜索 (用 pos/endpos 限定范围, 不复制子串)
     search_start = max(0, anchor_idx - 3000)
-    search_region = content[search_start:anchor_idx + 200]
+    search_end = anchor_idx + 200
+    
+    # 快速预检: 四个模式都以 "=" 开头, 区域内没有 "=" 时不必启动正则
+    if content.find('=', search_start, search_end) < 0:
+        logger.debug("v4 extraction: encrypted blob not found")
+        return None
+    
+    # 单趟扫描搜索区域, 记录每类模式的命中位置
+    blob_start = parts_start = idx_start = None
+    alpha_starts = []
+    for m in _V4_SCAN_RE.finditer(content, search_start, search_end):
+        kind = m.lastgroup
+        if kind == "alpha":
+            alpha_starts.append(m.start())
+        elif kind == "blob":
+            if blob_start is None:
+                blob_start = m.start()
+        elif kind == "parts":
+            if parts_start is None:
+                parts_start = m.start()
+        elif idx_start is None:
+            idx_start = m.start()
     
     # 1. 提取加密 blob (200+ 字符的 base64-like 字符串)
-    blob_match = re.search(V4_BLOB_PATTERN, search_region)
-    if not blob_match:
+    if blob_start is None:
         logger.debug("v4 extraction: encrypted blob not found")
         return None
+    blob_match = _V4_BLOB_RE.match(content, blob_start, search_end)
     encrypted_data = blob_match.group(1)
     logger.info(f"v4 extraction: found encrypted blob ({len(encrypted_data)} chars)")
     
     # 2. 提取自定义字母表 (恰好 64 字符)
     # 需要避免匹配 blob 的前 64 字符，所以从 blob 之后开始搜索
-    blob_end = blob_match.end()
-    alphabet_region = search_region[blob_end - search_start:] if blob_end > search_start else search_region
-    alphabet_match = re.search(V4_ALPHABET_PATTERN, alphabet_region)
+    blob_end = blob_match.end() - search_start  # 相对搜索区域的位置
+    alphabet_offset = blob_end - search_start if blob_end > search_start else 0
+    # 候选按位置有序, 一趟完成: 偏移之后的第一个候选直接采用;
+    # 偏移之前的候选只记下第一个不属于 blob 的作为后备
+    alphabet_match = None
+    fallback_match = None
+    for start in alpha_starts:
+        m = _V4_ALPHA_RE.match(content, start, search_end)
+        if start - search_start >= alphabet_offset:
+            alphabet_match = m
+            break
+        if fallback_match is None and m.group(1) not in encrypted_data:
+            fallback_match = m
     if not alphabet_match:
-        # 退而求其次，在整个区域搜索
-        for m in re.finditer(V4_ALPHABET_PATTERN, search_region):
-            candidate = m.group(1)
-            if candidate not in encrypted_data:
-                alphabet_match = m
-                break
+        # 退而求其次，使用整个区域中的后备候选
+        alphabet_match = fallback_match
     
     if not alphabet_match:
         logger.debug("v4 extraction: custom alphabet not found")
@@ -418,26 +899,26 @@ def extract_from_v4_output(content: str) -> Optional[Dict[str, Any]]:
         logger.warning(f"v4 extraction: alphabet has {len(set(custom_alphabet))} unique chars, expected 64")
     
     # 3. 提取密钥片段数组
-    parts_match = re.search(V4_KEY_PARTS_PATTERN, search_region)
-    if not parts_match:
+    if parts_start is None:
         logger.debug("v4 extraction: key parts array not found")
         return {
             "encrypted_data": encrypted_data,
             "custom_alphabet": custom_alphabet,
             "fixed_ts": None
         }
+    parts_match = _V4_KEY_PARTS_RE.match(content, parts_start, search_end)
     key_parts = [parts_match.group(1), parts_match.group(2), parts_match.group(3)]
     logger.info(f"v4 extraction: found key parts: {key_parts}")
     
     # 4. 提取索引数组
-    idx_match = re.search(V4_INDEX_PATTERN, search_region)
-    if not idx_match:
+    if idx_start is None:
         logger.debug("v4 extraction: index array not found")
         return {
             "encrypted_data": encrypted_data,
             "custom_alphabet": custom_alphabet,
             "fixed_ts": None
         }
+    idx_match = _V4_IDX_RE.match(content, idx_start, search_end)
     indices = [int(idx_match.group(1)), int(idx_match.group(2)), int(idx_match.group(3))]
     logger.info(f"v4 extraction: found indices: {indices}")
     
@@ -486,7 +967,7 @@ def extract_key_data_from_lzstring(content: str) -> Optional[Tuple[str, str]]:
         (encrypted_data, custom_alphabet) 元组，失败返回 None
     """
     # 查找 LZString 压缩字符串
-    match = re.search(r'var LcSqQ8 = "(.+?)"\s*,\s*Cn7qVG', content, re.DOTALL)
+    match = _LZ_CAPTURE_RE.search(content)
     if not match:
         return None
     
@@ -514,7 +995,7 @@ def extract_key_data_from_lzstring(content: str) -> Optional[Tuple[str, str]]:
             return encrypted_data, custom_alphabet
         
         return None
-        
+    
     except Exception:
         return None
 
@@ -533,7 +1014,7 @@ def extract_fixed_ts_from_lzstring(content: str) -> Optional[int]:
     Returns:
         _ts 值，失败返回 None
     """
-    match = re.search(r'var LcSqQ8 = "(.+?)"\s*,\s*Cn7qVG', content, re.DOTALL)
+    match = _LZ_CAPTURE_RE.search(content)
     if not match:
         return None
     
@@ -556,17 +1037,18 @@ def extract_fixed_ts_from_lzstring(content: str) -> Optional[int]:
         combined = agr9Oid[0] + agr9Oid[2] + agr9Oid[1]
         
         return int(combined, 36)
-        
+    
     except Exception:
         return None
 
 
-def extract_key_data_from_deobfuscated(content: str) -> Tuple[str, str]:
+def extract_key_data_from_deobfuscated(content: str, anchor_idx: Optional[int] = None) -> Tuple[str, str]:
     """
     从解混淆后的 JS 代码中提取加密数据和自定义字母表
     
     Args:
         content: 解混淆后的 JS 代码
+        anchor_idx: 已知的 decodeSecretFromBlob 位置 (可选, 传给 extract_from_v4_output)
     
     Returns:
         (encrypted_data, custom_alphabet) 元组
@@ -575,7 +1057,7 @@ def extract_key_data_from_deobfuscated(content: str) -> Tuple[str, str]:
         ValueError: 无法提取数据
     """
     # 方法 0: v4 反混淆输出格式 (推荐，最可靠)
-    v4_result = extract_from_v4_output(content)
+    v4_result = extract_from_v4_output(content, anchor_idx)
     if v4_result and v4_result.get("encrypted_data") and v4_result.get("custom_alphabet"):
         return v4_result["encrypted_data"], v4_result["custom_alphabet"]
     
@@ -584,8 +1066,12 @@ def extract_key_data_from_deobfuscated(content: str) -> Tuple[str, str]:
     if lz_result:
         return lz_result
     
+    # 方法 2-4 的加密数据都以 0E6V 开头, 不含该前缀时直接失败
+    if '0E6V' not in content:
+        raise ValueError("Failed to extract encryption data from deobfuscated JS")
+    
     # 方法 2: 尝试配对模式 (旧格式)
-    pair_match = re.search(PAIR_PATTERN, content)
+    pair_match = _PAIR_RE.search(content)
     if pair_match:
         encrypted_data = pair_match.group(1)
         custom_alphabet = pair_match.group(2)
@@ -595,8 +1081,8 @@ def extract_key_data_from_deobfuscated(content: str) -> Tuple[str, str]:
             return encrypted_data, custom_alphabet
     
     # 方法 3: 分别查找
-    encrypted_match = re.search(ENCRYPTED_DATA_PATTERN, content)
-    alphabet_match = re.search(CUSTOM_ALPHABET_PATTERN, content)
+    encrypted_match = _ENCRYPTED_RE.search(content)
+    alphabet_match = _ALPHABET_RE.search(content)
     
     if encrypted_match and alphabet_match:
         encrypted_data = encrypted_match.group(1)
@@ -604,16 +1090,13 @@ def extract_key_data_from_deobfuscated(content: str) -> Tuple[str, str]:
         return encrypted_data, custom_alphabet
     
     # 方法 4: 查找特定变量赋值模式
-    specific_pattern = r'[a-zA-Z_$][a-zA-Z0-9_$]*\s*=\s*"(0E6V[A-Za-z0-9+/=]{300,})"'
-    specific_match = re.search(specific_pattern, content)
+    specific_match = _SPECIFIC_RE.search(content)
     
     if specific_match:
         encrypted_data = specific_match.group(1)
         
         pos = specific_match.end()
-        remaining = content[pos:pos+500]
-        
-        alphabet_in_remaining = re.search(r'"([A-Za-z0-9+/]{64})"', remaining)
+        alphabet_in_remaining = _QUOTED_ALPHABET_RE.search(content, pos, pos + 500)
         if alphabet_in_remaining:
             custom_alphabet = alphabet_in_remaining.group(1)
             return encrypted_data, custom_alphabet
@@ -641,90 +1124,117 @@ def extract_key_data_from_raw(content: str) -> Optional[Tuple[str, str]]:
 
 # ==================== 密钥缓存 ====================
 
+# 已解析的缓存文件: ((st_mtime_ns, st_size), 数据)
+# 文件未变化时直接复用, 只需一次 stat, 不必重新解析 JSON
+_CACHE_MEM: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+
+
 def load_cached_key() -> Optional[Dict[str, Any]]:
     """
     加载缓存的密钥数据
     
+    按文件的 mtime / 大小缓存解析结果; 返回浅拷贝, 调用方修改不影响缓存。
+    
     Returns:
         缓存数据字典或 None
     """
+    global _CACHE_MEM
     cache_path = get_cache_path()
     
-    if not cache_path.exists():
+    try:
+        st = cache_path.stat()
+    except OSError:
         return None
     
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _CACHE_MEM is not None and _CACHE_MEM[0] == stamp:
+        return dict(_CACHE_MEM[1])
+    
     try:
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        raw = cache_path.read_bytes()
+    except OSError:
+        return None
+    
+    try:
+        # 直接解析字节, 不经过 str 解码
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     except:
         return None
+    
+    if not isinstance(data, dict):
+        return data
+    _CACHE_MEM = (stamp, data)
+    return dict(data)
 
 
 def save_key_cache(data: Dict[str, Any]):
     """
     保存密钥到缓存
     
+    先写入同目录下的临时文件再 os.replace, 中途崩溃不会留下写了一半的缓存文件。
+    
     Args:
         data: 要缓存的数据
     """
+    global _CACHE_MEM
     cache_path = get_cache_path()
     
-    with open(cache_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    # 临时文件名带进程 / 线程标识, 并发写入互不干扰
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    
+    st = cache_path.stat()
+    _CACHE_MEM = ((st.st_mtime_ns, st.st_size), dict(data))
 
 
 # ==================== 主要接口 ====================
 
-async def fetch_and_extract_secret(
-    js_url: str = JS_BASE_URL,
-    ch_param: Optional[str] = None,
-    use_cache: bool = True,
-    force_update: bool = False
+def _extract_and_cache(
+    js_bytes: bytes,
+    validators: Dict[str, str],
+    cached: Optional[Dict[str, Any]]
 ) -> Dict[str, Any]:
     """
-    获取并提取密钥 (主要接口)
+    下载完成后的共享流程: 哈希比对 → 解混淆 → 提取并解密 → 更新缓存
     
-    完整流程:
-    1. 检查缓存是否有效
-    2. 下载 JS 文件
-    3. 检查 JS 是否有变化
-    4. 解混淆
-    5. 提取并解密密钥
-    6. 更新缓存
+    同步 / 异步接口只在下载方式上不同, 其余步骤都是同步的 CPU 工作,
+    统一在此实现。异步接口通过 asyncio.to_thread 在线程中调用,
+    解混淆 (最长可达数十秒) 期间不阻塞事件循环。
     
     Args:
-        js_url: JS 文件 URL
-        ch_param: ch 参数
-        use_cache: 是否使用缓存
-        force_update: 是否强制更新
+        js_bytes: JS 文件原始字节
+        validators: 响应中的缓存校验头
+        cached: 已加载的缓存数据 (可为 None)
     
     Returns:
-        {
-            "secret": 解密后的密钥,
-            "encrypted_data": 加密数据,
-            "custom_alphabet": 自定义字母表,
-            "js_hash": JS 文件哈希,
-            "updated_at": 更新时间,
-            "from_cache": 是否来自缓存
-        }
+        与 fetch_and_extract_secret 相同的结果字典
     """
-    # 检查缓存
-    if use_cache and not force_update:
-        cached = load_cached_key()
-        if cached and "secret" in cached:
-            cached["from_cache"] = True
-            return cached
-    
-    # 下载 JS
-    js_content = await download_js_file(js_url, ch_param)
-    js_hash = calculate_js_hash(js_content)
+    js_hash = calculate_js_hash(js_bytes)
     
     # 检查是否与缓存相同
-    if use_cache and not force_update:
-        cached = load_cached_key()
-        if cached and cached.get("js_hash") == js_hash:
-            cached["from_cache"] = True
-            return cached
+    if cached and cached.get("js_hash") == js_hash:
+        # 内容未变: 补记新的校验头, 供 check_key_update 做条件请求
+        if any(cached.get(key) != value for key, value in validators.items()):
+            cached.update(validators)
+            save_key_cache(cached)
+        cached["from_cache"] = True
+        return cached
+    
+    js_content = js_bytes.decode('utf-8', errors='replace')
+    del js_bytes
     
     # 尝试直接从原始 JS 提取 (可能未混淆)
     direct_result = extract_key_data_from_raw(js_content)
@@ -737,15 +1247,18 @@ async def fetch_and_extract_secret(
         # 需要解混淆
         deobfuscated = run_deobfuscator(js_content)
         
+        # 锚点只查找一次, 降级提取时复用
+        anchor_idx = deobfuscated.rfind('decodeSecretFromBlob')
+        
         # 优先使用 v4 提取 (能同时获取加密数据、字母表和 _ts)
-        v4_result = extract_from_v4_output(deobfuscated)
+        v4_result = extract_from_v4_output(deobfuscated, anchor_idx)
         if v4_result and v4_result.get("encrypted_data") and v4_result.get("custom_alphabet"):
             encrypted_data = v4_result["encrypted_data"]
             custom_alphabet = v4_result["custom_alphabet"]
             fixed_ts = v4_result.get("fixed_ts")
         else:
             # 降级到旧的提取方式
-            encrypted_data, custom_alphabet = extract_key_data_from_deobfuscated(deobfuscated)
+            encrypted_data, custom_alphabet = extract_key_data_from_deobfuscated(deobfuscated, anchor_idx)
     
     # 解密密钥
     secret = decode_secret_from_blob(encrypted_data, custom_alphabet)
@@ -768,29 +1281,87 @@ async def fetch_and_extract_secret(
     if fixed_ts:
         result["fixed_ts"] = fixed_ts
     
+    # 记录 ETag / Last-Modified, 之后可用条件请求检查更新
+    result.update(validators)
+    
     # 保存缓存
     save_key_cache(result)
     
     return result
 
 
+async def fetch_and_extract_secret(
+    js_url: str = JS_BASE_URL,
+    ch_param: Optional[str] = None,
+    use_cache: bool = True,
+    force_update: bool = False
+) -> Dict[str, Any]:
+    """
+    获取并提取密钥 (主要接口)
+    
+    完整流程:
+    1. 检查缓存是否有效
+    2. 下载 JS 文件
+    3. 检查 JS 是否有变化
+    4. 解混淆
+    5. 提取并解密密钥
+    6. 更新缓存
+    
+    Args:
+        js_url: JS 文件 URL
+        ch_param: ch 参数
+        use_cache: 是否使用缓存
+        force_update: 是否强制更新
+    
+    Returns:
+        {
+            "secret": 解密后的密钥,
+            "encrypted_data": 加密数据,
+            "custom_alphabet": 自定义字母表,
+            "js_hash": JS 文件哈希,
+            "updated_at": 更新时间,
+            "from_cache": 是否来自缓存
+        }
+    """
+    # 检查缓存 (只读取一次, 下载后的哈希比对复用同一份数据)
+    cached = load_cached_key() if use_cache and not force_update else None
+    if cached and "secret" in cached:
+        cached["from_cache"] = True
+        return cached
+    
+    # 下载 JS (对原始字节计算哈希, 解码后的文本只用于提取)
+    js_bytes, validators = await download_js_with_validators(js_url, ch_param)
+    # 解混淆和解密在线程中执行 (DeobfuscatorDaemon 自带锁, 可跨线程调用)
+    return await asyncio.to_thread(_extract_and_cache, js_bytes, validators, cached)
+
+
 def fetch_and_extract_secret_sync(
     js_url: str = JS_BASE_URL,
     ch_param: Optional[str] = None,
     use_cache: bool = True,
     force_update: bool = False
 ) -> Dict[str, Any]:
-    """同步版本的密钥获取函数"""
-    return asyncio.run(fetch_and_extract_secret(
-        js_url, ch_param, use_cache, force_update
-    ))
+    """
+    同步版本的密钥获取函数
+    
+    直接使用共享的同步 HTTP 客户端下载, 不创建事件循环。
+    """
+    cached = load_cached_key() if use_cache and not force_update else None
+    if cached and "secret" in cached:
+        cached["from_cache"] = True
+        return cached
+    
+    js_bytes, validators = download_js_with_validators_sync(js_url, ch_param)
+    return _extract_and_cache(js_bytes, validators, cached)
 
 
 async def check_key_update(js_url: str = JS_BASE_URL, ch_param: Optional[str] = None) -> bool:
     """
     检查密钥是否需要更新
     
-    比较远程 JS 文件的哈希与缓存的哈希。
+    缓存中有 ETag / Last-Modified 时先发 HEAD 比对校验头, 不一致再发条件 GET
+    (304 视为未变化); 只有拿到完整响应时才比较远程 JS 文件的哈希与缓存的哈希,
+    哈希一致时把新的校验头写回缓存。
     
     Args:
         js_url: JS 文件 URL
@@ -803,11 +1374,36 @@ async def check_key_update(js_url: str = JS_BASE_URL, ch_param: Optional[str] =
     if not cached:
         return True
     
-    # 只获取文件头部来计算哈希
-    js_content = await download_js_file(js_url, ch_param)
-    js_hash = calculate_js_hash(js_content)
+    full_url = _build_js_url(js_url, ch_param)
+    conditional_headers = {}
+    if cached.get("etag"):
+        conditional_headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        conditional_headers["If-Modified-Since"] = cached["last_modified"]
+    
+    client = _get_client()
+    if conditional_headers:
+        # 1. HEAD: 校验头一致则无需下载
+        head = await client.head(full_url, follow_redirects=True)
+        if head.is_success and _validators_match(cached, _response_validators(head)):
+            return False
+    
+    # 2. 条件 GET: 服务器返回 304 表示未变化
+    response = await client.get(full_url, headers=conditional_headers, follow_redirects=True)
+    if response.status_code == 304:
+        return False
+    response.raise_for_status()
+    
+    # 直接对原始字节计算哈希 (不需要解码); 数 MB 的哈希在线程中计算, 不阻塞事件循环
+    if await asyncio.to_thread(calculate_js_hash, response.content) != cached.get("js_hash"):
+        return True
     
-    return js_hash != cached.get("js_hash")
+    # 内容未变但校验头有变化 (或之前未记录): 写回缓存, 下次检查即可命中 304
+    validators = _response_validators(response)
+    if any(cached.get(key) != value for key, value in validators.items()):
+        cached.update(validators)
+        save_key_cache(cached)
+    return False
 
 
 # ==================== CLI 入口 ====================
@@ -835,7 +1431,7 @@ if __name__ == "__main__":
         print(f"  JS Hash: {result['js_hash']}")
         print(f"  Updated At: {result['updated_at']}")
         print(f"  From Cache: {result['from_cache']}")
-        
+    
     except Exception as e:
         print(f"Error: {e}")
         import traceback
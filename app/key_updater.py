@@ -11,19 +11,20 @@
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List, Tuple
 from contextlib import asynccontextmanager
 
 from .js_extractor import (
     fetch_and_extract_secret,
     check_key_update,
+    close_http_clients,
     load_cached_key,
     JS_BASE_URL
 )
+from .signature import clear_hmac_cache
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -35,42 +36,191 @@ DEFAULT_CHECK_INTERVAL_HOURS = 6
 # 密钥最大有效期 (小时)
 MAX_KEY_AGE_HOURS = 72  # 3天
 
+# 过期密钥的最长可用时间 (小时): 超过后不再先返回旧密钥, 而是等待更新完成
+MAX_STALE_KEY_AGE_HOURS = MAX_KEY_AGE_HOURS * 2
+
+# 每个订阅者队列最多积压的更新通知数
+SUBSCRIBER_QUEUE_SIZE = 16
+
 
 # ==================== 全局状态 ====================
 
 class KeyState:
-    """密钥状态管理"""
+    """
+    密钥状态管理
+    
+    to_dict() 的结果会被缓存, _DICT_FIELDS 中的属性赋值会使缓存失效并递增 version。
+    """
+    
+    # to_dict() 依赖的属性 (property 按其底层属性名); 其他内部属性赋值不影响缓存和 version
+    _DICT_FIELDS = frozenset({
+        "_current_secret", "_last_update", "last_check", "js_hash",
+        "update_count", "error_count", "last_error",
+    })
     
     def __init__(self):
-        self.current_secret: Optional[str] = None
+        object.__setattr__(self, "version", 0)
+        self._dict_cache: Optional[Dict[str, Any]] = None
+        self._current_secret: Optional[str] = None
+        self.current_secret_bytes: Optional[bytes] = None
         self.fixed_ts: Optional[int] = None
-        self.last_update: Optional[datetime] = None
+        self._last_update: Optional[datetime] = None
+        self.last_update_monotonic: Optional[float] = None
         self.last_check: Optional[datetime] = None
         self.js_hash: Optional[str] = None
         self.update_count: int = 0
         self.error_count: int = 0
         self.last_error: Optional[str] = None
-        self._callbacks: list = []
+        self._subscribers: List[asyncio.Queue] = []
+        self._callbacks: List[Callable[[str, str], None]] = []
+        self._callback_workers: Dict[int, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._init_task: Optional[asyncio.Task] = None
+    
+    def __setattr__(self, name: str, value: Any):
+        """to_dict() 依赖的属性变化时使缓存失效, 并递增状态版本号 (用于 ETag)"""
+        object.__setattr__(self, name, value)
+        if name in self._DICT_FIELDS:
+            object.__setattr__(self, "_dict_cache", None)
+            object.__setattr__(self, "version", self.version + 1)
+    
+    @property
+    def current_secret(self) -> Optional[str]:
+        """当前密钥 (十六进制字符串)"""
+        return self._current_secret
+    
+    @current_secret.setter
+    def current_secret(self, value: Optional[str]):
+        """
+        设置密钥时同步预解码的密钥字节, 签名热路径无需再 bytes.fromhex
+        
+        先解码再赋值: 非法十六进制抛出 ValueError 时状态保持不变。
+        """
+        secret_bytes = bytes.fromhex(value) if value else None
+        self._current_secret = value
+        self.current_secret_bytes = secret_bytes
+    
+    @property
+    def last_update(self) -> Optional[datetime]:
+        """最后更新时间 (墙上时间)"""
+        return self._last_update
+    
+    @last_update.setter
+    def last_update(self, value: Optional[datetime]):
+        """
+        设置最后更新时间时同步换算到单调时钟
+        
+        过期检查只需比较浮点数, 也不受系统时间调整影响。
+        从缓存恢复的历史时间按当前墙上时间差折算。
+        """
+        self._last_update = value
+        if value is None:
+            self.last_update_monotonic = None
+        else:
+            self.last_update_monotonic = time.monotonic() - (datetime.now() - value).total_seconds()
+    
+    def subscribe(self, maxsize: int = SUBSCRIBER_QUEUE_SIZE) -> asyncio.Queue:
+        """
+        订阅密钥更新
+        
+        每次更新向队列放入 (old_secret, new_secret), 由订阅者在自己的任务中读取。
+        
+        Returns:
+            订阅队列
+        """
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """取消订阅"""
+        try:
+            self._subscribers.remove(queue)
+        except ValueError:
+            pass
     
     def register_callback(self, callback: Callable[[str, str], None]):
         """
         注册密钥更新回调
         
         callback(old_secret, new_secret)
+        
+        在事件循环中通知时, 回调在独立任务中从订阅队列读取并执行, 不会阻塞更新流程,
+        因此 update_key 返回时回调可能尚未执行; 队列和任务在首次通知时创建。
+        在同步代码中 (没有运行中的事件循环) 调用 notify_update 时, 回调在调用中直接执行。
         """
         self._callbacks.append(callback)
     
+    def _ensure_callback_workers(self):
+        """为每个回调启动队列消费任务 (任务随旧事件循环结束时重新创建)"""
+        for i, callback in enumerate(self._callbacks):
+            worker = self._callback_workers.get(i)
+            if worker is not None and not worker[1].done():
+                continue
+            if worker is not None:
+                # 旧队列绑定在已结束的事件循环上, 不再复用
+                self.unsubscribe(worker[0])
+            queue = self.subscribe()
+            self._callback_workers[i] = (queue, asyncio.create_task(_drain_callback_queue(callback, queue)))
+    
     def notify_update(self, old_secret: Optional[str], new_secret: str):
-        """通知所有回调密钥已更新"""
-        for callback in self._callbacks:
+        """
+        向所有订阅者广播密钥更新 (只入队, 从不等待)
+        
+        回调的执行时机见 register_callback: 事件循环中异步执行,
+        没有运行中的事件循环时在此同步执行 (不再经过回调的订阅队列)。
+        """
+        skip_queues = ()
+        if self._callbacks:
             try:
-                callback(old_secret, new_secret)
-            except Exception as e:
-                logger.error(f"Callback error: {e}")
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # 同步调用: 没有事件循环运行消费任务, 直接执行回调
+                for callback in self._callbacks:
+                    _run_callback(callback, old_secret, new_secret)
+                skip_queues = [queue for queue, _ in self._callback_workers.values()]
+            else:
+                self._ensure_callback_workers()
+        
+        for queue in self._subscribers:
+            if queue in skip_queues:
+                continue
+            try:
+                queue.put_nowait((old_secret, new_secret))
+            except asyncio.QueueFull:
+                logger.warning("Key update subscriber queue is full, dropping notification")
+    
+    async def cancel_tasks(self):
+        """
+        取消并等待本状态持有的后台任务 (初始化 / 后台刷新 / 回调消费)
+        
+        在事件循环关闭前调用, 回调消费任务的队列同时取消订阅,
+        下次通知时在新的事件循环中重新创建。
+        """
+        tasks = [self._init_task, self._refresh_task]
+        tasks.extend(task for _, task in self._callback_workers.values())
+        for queue, _ in self._callback_workers.values():
+            self.unsubscribe(queue)
+        self._callback_workers.clear()
+        self._init_task = None
+        self._refresh_task = None
+        
+        tasks = [task for task in tasks if task is not None and not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
     
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
+        """
+        转换为字典
+        
+        状态未变化时返回缓存的同一个字典, 调用方不应修改返回值。
+        """
+        if self._dict_cache is not None:
+            return self._dict_cache
+        
+        self._dict_cache = {
             "current_secret": self.current_secret[:40] + "..." if self.current_secret else None,
             "secret_length": len(self.current_secret) if self.current_secret else 0,
             "last_update": self.last_update.isoformat() if self.last_update else None,
@@ -80,14 +230,37 @@ class KeyState:
             "error_count": self.error_count,
             "last_error": self.last_error
         }
+        return self._dict_cache
+
+
+def _run_callback(callback: Callable[[str, str], None], old_secret: Optional[str], new_secret: str):
+    """调用单个回调, 异常只记录日志"""
+    try:
+        callback(old_secret, new_secret)
+    except Exception as e:
+        logger.error(f"Callback error: {e}")
+
+
+async def _drain_callback_queue(callback: Callable[[str, str], None], queue: asyncio.Queue):
+    """逐条读取订阅队列并调用回调"""
+    while True:
+        old_secret, new_secret = await queue.get()
+        _run_callback(callback, old_secret, new_secret)
 
 
 # 全局状态实例
 key_state = KeyState()
 
+# 密钥轮换后清空 HMAC 原型缓存, 避免旧密钥常驻内存
+key_state.register_callback(lambda old_secret, new_secret: clear_hmac_cache())
+
 
 # ==================== 更新逻辑 ====================
 
+# 正在进行的更新任务: (js_url, ch_param, force) -> Task
+_inflight_updates: Dict[Tuple[str, Optional[str], bool], "asyncio.Task"] = {}
+
+
 async def update_key(
     js_url: str = JS_BASE_URL,
     ch_param: Optional[str] = None,
@@ -96,6 +269,9 @@ async def update_key(
     """
     更新密钥
     
+    相同参数的并发调用共享同一个更新任务 (single-flight), 只下载和解析一次 JS,
+    所有调用方得到相同的结果或异常。
+    
     Args:
         js_url: JS 文件 URL
         ch_param: ch 参数
@@ -104,6 +280,45 @@ async def update_key(
     Returns:
         更新结果
     """
+    flight_key = (js_url, ch_param, force)
+    task = _inflight_updates.get(flight_key)
+    # 检查与创建之间没有 await, 在单个事件循环内天然互斥, 无需额外加锁;
+    # 其他事件循环遗留的任务 (如多次 asyncio.run) 不可复用
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_do_update(js_url, ch_param, force))
+        _inflight_updates[flight_key] = task
+        task.add_done_callback(lambda t: _release_inflight_update(flight_key, t))
+    
+    # shield: 某个调用方被取消时不影响其他等待者
+    return await asyncio.shield(task)
+
+
+def _release_inflight_update(flight_key: Tuple[str, Optional[str], bool], task: "asyncio.Task"):
+    """更新任务完成后移出登记表 (仅当登记的仍是该任务时)"""
+    if _inflight_updates.get(flight_key) is task:
+        del _inflight_updates[flight_key]
+    # 所有等待者都已取消时, 避免 "exception was never retrieved" 警告
+    if not task.cancelled():
+        task.exception()
+
+
+async def _cancel_inflight_updates():
+    """取消并等待当前事件循环中正在进行的更新任务, 然后清空登记表"""
+    loop = asyncio.get_running_loop()
+    tasks = [task for task in _inflight_updates.values() if task.get_loop() is loop and not task.done()]
+    _inflight_updates.clear()
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _do_update(
+    js_url: str,
+    ch_param: Optional[str],
+    force: bool
+) -> Dict[str, Any]:
+    """update_key 的实际实现 (参数同 update_key)"""
     global key_state
     
     try:
@@ -151,7 +366,7 @@ async def update_key(
             "key_changed": key_changed,
             "updated_at": key_state.last_update.isoformat()
         }
-        
+    
     except Exception as e:
         key_state.error_count += 1
         key_state.last_error = str(e)
@@ -163,41 +378,77 @@ async def get_current_secret() -> str:
     """
     获取当前密钥
     
-    如果密钥不存在或已过期,会自动更新。
+    如果密钥不存在会等待更新; 已过期时先返回旧密钥并在后台刷新,
+    过期超过 MAX_STALE_KEY_AGE_HOURS 时才等待更新完成。
     
     Returns:
         当前有效的密钥
     """
     global key_state
     
+    # 启动时的后台初始化仍在进行: 等待其完成, 不重复获取
+    # (shield 避免请求被取消时连带取消初始化任务)
+    init_task = key_state._init_task
+    if key_state.current_secret is None and init_task is not None \
+            and not init_task.done() and init_task is not asyncio.current_task():
+        await asyncio.shield(init_task)
+    
     # 检查是否需要初始化
     if key_state.current_secret is None:
         # 尝试从缓存加载
         cached = load_cached_key()
         if cached and "secret" in cached:
-            key_state.current_secret = cached["secret"]
-            key_state.fixed_ts = cached.get("fixed_ts")
-            key_state.js_hash = cached.get("js_hash")
-            if "updated_at" in cached:
-                try:
-                    key_state.last_update = datetime.fromisoformat(cached["updated_at"])
-                except:
-                    pass
-    
-    # 检查密钥是否过期
-    if key_state.current_secret is None or _is_key_expired():
-        await update_key(force=key_state.current_secret is None)
+            try:
+                key_state.current_secret = cached["secret"]
+            except ValueError as e:
+                # 缓存中的密钥不是合法十六进制: 视为未命中, 由下方冷启动更新修复缓存
+                logger.warning(f"Ignoring invalid cached secret: {e}")
+            else:
+                key_state.fixed_ts = cached.get("fixed_ts")
+                key_state.js_hash = cached.get("js_hash")
+                if "updated_at" in cached:
+                    try:
+                        key_state.last_update = datetime.fromisoformat(cached["updated_at"])
+                    except:
+                        pass
+    
+    # 冷启动: 没有可用密钥, 只能等待更新完成
+    if key_state.current_secret is None:
+        await update_key(force=True)
+    elif _is_key_expired():
+        if _is_key_expired(MAX_STALE_KEY_AGE_HOURS):
+            # 过期太久, 不再使用旧密钥
+            await update_key()
+        else:
+            # stale-while-revalidate: 先返回旧密钥, 后台刷新 (同一时间只有一个刷新任务)
+            _schedule_background_refresh()
     
     return key_state.current_secret
 
 
-def _is_key_expired() -> bool:
-    """检查密钥是否过期"""
-    if key_state.last_update is None:
+def _schedule_background_refresh():
+    """在后台刷新密钥, 已有刷新任务在运行时不重复创建"""
+    task = key_state._refresh_task
+    if task is not None and not task.done():
+        return
+    key_state._refresh_task = asyncio.create_task(_background_refresh())
+
+
+async def _background_refresh():
+    """后台刷新密钥 (错误已由 update_key 记录到 key_state)"""
+    try:
+        await update_key()
+    except Exception as e:
+        logger.error(f"Background refresh failed: {e}")
+
+
+def _is_key_expired(max_age_hours: float = MAX_KEY_AGE_HOURS) -> bool:
+    """检查密钥是否超过指定有效期 (默认 MAX_KEY_AGE_HOURS)"""
+    updated = key_state.last_update_monotonic
+    if updated is None:
         return True
     
-    age = datetime.now() - key_state.last_update
-    return age > timedelta(hours=MAX_KEY_AGE_HOURS)
+    return time.monotonic() - updated > max_age_hours * 3600
 
 
 # ==================== 后台更新任务 ====================
@@ -216,17 +467,32 @@ class KeyUpdaterTask:
         self.ch_param = ch_param
         self._task: Optional[asyncio.Task] = None
         self._running = False
+        self._wakeup: Optional[asyncio.Event] = None
     
     async def _run_loop(self):
-        """后台循环"""
+        """
+        后台循环
+        
+        按固定节拍调度: 下次检查时间从本次检查开始时计算, 不会因 update_key
+        的耗时累积漂移; 等待期间 stop() 可通过 _wakeup 立即唤醒。
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeup
+        
         while self._running:
+            deadline = loop.time() + self.check_interval.total_seconds()
+            
             try:
                 await update_key(self.js_url, self.ch_param)
             except Exception as e:
                 logger.error(f"Background update failed: {e}")
             
-            # 等待下次检查
-            await asyncio.sleep(self.check_interval.total_seconds())
+            # 等待下次检查 (或被 stop() 唤醒)
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
     
     def start(self):
         """启动后台任务"""
@@ -234,12 +500,16 @@ class KeyUpdaterTask:
             return
         
         self._running = True
+        # Event 在运行中的事件循环里创建, 避免跨循环复用
+        self._wakeup = asyncio.Event()
         self._task = asyncio.create_task(self._run_loop())
         logger.info(f"Key updater started, interval: {self.check_interval}")
     
     def stop(self):
         """停止后台任务"""
         self._running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
         if self._task:
             self._task.cancel()
             self._task = None
@@ -264,6 +534,7 @@ async def lifespan_key_updater(check_interval_hours: float = DEFAULT_CHECK_INTER
     FastAPI lifespan 上下文管理器
     
     用于在应用启动时开始后台更新,关闭时停止。
+    初始密钥在后台获取, 应用无需等待下载和解混淆完成即可开始接受请求。
     
     Example:
         @asynccontextmanager
@@ -276,19 +547,28 @@ async def lifespan_key_updater(check_interval_hours: float = DEFAULT_CHECK_INTER
     updater = get_updater_task()
     updater.check_interval = timedelta(hours=check_interval_hours)
     
-    # 初始化密钥
+    # 在后台初始化密钥并随后启动定时更新, 不阻塞应用启动;
+    # 初始化完成前到达的请求会在 get_current_secret 中等待该任务
+    key_state._init_task = asyncio.create_task(_initialize_key(updater))
+    
+    try:
+        yield
+    finally:
+        await key_state.cancel_tasks()
+        updater.stop()
+        # 等待方已取消, 但实际更新任务受 shield 保护仍在运行; 须在关闭 HTTP 客户端前取消
+        await _cancel_inflight_updates()
+        await close_http_clients()
+
+
+async def _initialize_key(updater: KeyUpdaterTask):
+    """初始化密钥, 然后启动后台更新任务"""
     try:
         await get_current_secret()
     except Exception as e:
         logger.error(f"Initial key fetch failed: {e}")
     
-    # 启动后台更新
     updater.start()
-    
-    try:
-        yield
-    finally:
-        updater.stop()
 
 
 # ==================== 便捷函数 ====================
@@ -320,6 +600,8 @@ def get_key_status() -> Dict[str, Any]:
 if __name__ == "__main__":
     import sys
     
+    logging.basicConfig(level=logging.INFO)
+    
     async def main():
         print("Key Updater Test")
         print("=" * 50)
@@ -333,7 +615,7 @@ if __name__ == "__main__":
             if "secret" in result:
                 print(f"Secret: {result['secret'][:40]}...")
             print(f"\nKey State: {get_key_status()}")
-            
+        
         except Exception as e:
             print(f"Error: {e}")
             import traceback
@@ -15,11 +15,17 @@ API 文档:
     http://localhost:8000/redoc (ReDoc)
 """
 
+from __future__ import annotations
+
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Union, Dict, Any, Optional
+import asyncio
+import functools
+import hashlib
 import time
 import logging
 
@@ -29,12 +35,11 @@ from .signature import (
     generate_signature,
     create_signed_request,
     sha256_hash,
-    sort_object_keys
+    serialize_request_bytes
 )
 from .js_extractor import (
     fetch_and_extract_secret,
     check_key_update,
-    load_cached_key,
     JS_BASE_URL
 )
 from .key_updater import (
@@ -46,9 +51,6 @@ from .key_updater import (
 )
 from .instagram_api import (
     InstagramAPIClient,
-    UserInfoRequest,
-    PostsRequest,
-    PostDetailRequest,
     UserInfoResponse,
     PostsResponse,
     PostDetailResponse,
@@ -56,12 +58,17 @@ from .instagram_api import (
     get_current_timestamp as ig_get_current_timestamp
 )
 
-# 配置日志
+# 配置日志 (应用入口负责根日志配置; 已配置 handler 时 basicConfig 不做任何事)
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 # ================== Pydantic 模型定义 ==================
 
+# 自定义字母表必须是标准 Base64 64 个字符的一个排列
+_B64_ALPHABET_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")
+
+
 class DecodeSecretRequest(BaseModel):
     """解密密钥请求模型"""
     encrypted_data: str = Field(
@@ -74,6 +81,14 @@ class DecodeSecretRequest(BaseModel):
         description="自定义 Base64 字母表 (64个字符)",
         example="05c4LAGfVl9d6pkOEQ1o8r+wz7FgRUTHeJqKDythXn3YSvBMsPjaiN2ub/CIWZmx"
     )
+    
+    @field_validator("custom_alphabet")
+    @classmethod
+    def _check_alphabet(cls, v: str) -> str:
+        """字母表须为 64 个不重复的 Base64 字符 (在解码前拒绝无效输入)"""
+        if len(v) != 64 or frozenset(v) != _B64_ALPHABET_CHARS:
+            raise ValueError("custom_alphabet must be a permutation of the 64 Base64 characters")
+        return v
 
 
 class DecodeSecretResponse(BaseModel):
@@ -176,9 +191,16 @@ async def lifespan(app: FastAPI):
     # 启动: 初始化密钥并开启后台更新
     logger.info("Starting AnonyIG Signature Service...")
     
-    async with lifespan_key_updater(check_interval_hours=6):
-        logger.info("Key updater initialized")
-        yield
+    # 共享的 Instagram 客户端: 所有 /api/instagram/* 请求复用同一个会话 (连接池)
+    app.state.ig_client = InstagramAPIClient()
+    await app.state.ig_client.__aenter__()
+    
+    try:
+        async with lifespan_key_updater(check_interval_hours=6):
+            logger.info("Key updater initialized")
+            yield
+    finally:
+        await app.state.ig_client.__aexit__(None, None, None)
     
     logger.info("Shutting down...")
 
@@ -195,20 +217,20 @@ app = FastAPI(
 ## 核心功能
 
 1. **密钥解码** - 从加密的 blob 数据中解码出签名密钥
-2. **签名生成** - 使用 SHA-256 算法生成请求签名
+2. **签名生成** - 使用 HMAC-SHA256 算法生成请求签名
 3. **请求体构建** - 创建包含签名的完整请求体
 4. **自动密钥更新** - 自动从远程 JS 提取最新密钥 (每6小时检查一次)
 
 ## 签名算法
 
 ```
-_s = SHA256(data + timestamp + secret_key)
+_s = HMAC-SHA256(secret_key_bytes, data + timestamp)
 ```
 
 其中:
 - `data`: 请求数据 (URL 或 JSON 序列化后的对象, 键已排序)
 - `timestamp`: 毫秒时间戳
-- `secret_key`: 解密后的密钥
+- `secret_key_bytes`: 解密后的密钥 (hex 转 bytes)
 
 ## 自动化流程
 
@@ -253,10 +275,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 全局签名生成器
+# 全局签名生成器 (/api/auto-signed-request 复用, 密钥随 key_state 轮换)
 signature_generator = SignatureGenerator()
 
 
+@functools.lru_cache(maxsize=1)
+def _cached_default_secret_bytes() -> bytes:
+    """
+    默认密钥的字节形式 (HMAC 密钥)
+    
+    直接传给签名函数, 使用已绑定该密钥的 HMAC 状态, 每次签名只需处理 data + timestamp。
+    """
+    return bytes.fromhex(get_default_secret())
+
+
+# 超过该长度 (字符) 的哈希 / 签名放到线程池计算, 避免阻塞事件循环;
+# 较短的输入直接计算 (线程切换的开销比哈希本身更大)
+HASH_OFFLOAD_THRESHOLD = 16 * 1024
+
+
+# ================== 条件请求 (ETag) ==================
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """
+    检查请求的 If-None-Match 是否命中 etag
+    
+    按弱比较处理 (忽略 W/ 前缀), 支持逗号分隔的多个值和 "*"。
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _not_modified(etag: str) -> Response:
+    """构建 304 响应 (无响应体)"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+# 进程标识: 版本号在重启后从 0 开始, 拼上它避免不同进程的 ETag 相撞
+_KEY_STATUS_ETAG_EPOCH = format(time.time_ns(), "x")
+
+
+def _key_status_etag() -> str:
+    """
+    密钥状态的 ETag
+    
+    由 KeyState.version 生成, 只有 to_dict() 依赖的状态属性赋值才会改变它。
+    """
+    return f'W/"{_KEY_STATUS_ETAG_EPOCH}-{key_state.version}"'
+
+
 # ================== API 路由 ==================
 
 @app.get("/", tags=["基础"])
@@ -273,17 +352,19 @@ async def root():
 
 
 @app.get("/msec", response_model=TimeSyncResponse, tags=["基础"])
-async def get_server_time():
+async def get_server_time(response: Response):
     """
     获取服务器时间
     
     用于客户端时间同步,返回当前服务器时间。
     客户端可以通过比较本地时间与服务器时间来计算时间偏移量。
     """
-    current_time = time.time()
+    # 只读取一次时钟, 两个字段由同一个整数纳秒值推导 (毫秒值不经过浮点)
+    now_ns = time.time_ns()
+    response.headers["Cache-Control"] = "no-store"
     return {
-        "msec": current_time,
-        "timestamp": int(current_time * 1000)
+        "msec": now_ns / 1e9,
+        "timestamp": now_ns // 1_000_000
     }
 
 
@@ -347,7 +428,7 @@ async def api_generate_signature(request: SignatureRequest):
     """
     生成请求签名
     
-    计算 SHA-256 签名: `_s = SHA256(data + timestamp + secret)`
+    计算 HMAC-SHA256 签名: `_s = HMAC-SHA256(secret_bytes, data + timestamp)`
     
     ## 参数说明
     
@@ -367,19 +448,21 @@ async def api_generate_signature(request: SignatureRequest):
         # 处理时间戳
         timestamp = request.timestamp or int(time.time() * 1000)
         
-        # 处理密钥
-        secret_key = request.secret_key or get_default_secret()
+        # 处理密钥 (默认密钥直接使用预解码的字节)
+        secret_key = request.secret_key or _cached_default_secret_bytes()
         
-        # 处理请求数据
+        # 处理请求数据: 对象只序列化一次, 签名直接使用 UTF-8 字节, 响应使用解码后的字符串
         if isinstance(request.request_data, str):
-            data_string = request.request_data
+            data_string = message_data = request.request_data
         else:
-            sorted_data = sort_object_keys(request.request_data)
-            import json
-            data_string = json.dumps(sorted_data, separators=(',', ':'), ensure_ascii=False)
+            message_data = serialize_request_bytes(request.request_data)
+            data_string = message_data.decode('utf-8')
         
-        # 生成签名
-        signature = await generate_signature(request.request_data, timestamp, secret_key)
+        # 生成签名 (大负载放到线程池)
+        if len(data_string) > HASH_OFFLOAD_THRESHOLD:
+            signature = await asyncio.to_thread(generate_signature, message_data, timestamp, secret_key)
+        else:
+            signature = generate_signature(message_data, timestamp, secret_key)
         
         return {
             "signature": signature,
@@ -438,9 +521,11 @@ async def api_create_signed_request(request: SignedRequestRequest):
     ```
     """
     try:
-        signed_body = await create_signed_request(
+        # request_data 是本次请求解析出的新字典, 无需再复制
+        signed_body = create_signed_request(
             request.request_data,
-            request.time_offset
+            request.time_offset,
+            copy=False
         )
         return {"signed_body": signed_body}
     except Exception as e:
@@ -462,9 +547,14 @@ async def api_sha256(text: str):
     
     - **hash**: 64位十六进制哈希值
     """
+    if len(text) > HASH_OFFLOAD_THRESHOLD:
+        hash_value = await asyncio.to_thread(sha256_hash, text)
+    else:
+        hash_value = sha256_hash(text)
+    
     return {
         "text": text,
-        "hash": sha256_hash(text)
+        "hash": hash_value
     }
 
 
@@ -514,7 +604,7 @@ async def api_fetch_remote_key(request: FetchKeyRequest):
             updated_at=result["updated_at"],
             from_cache=result.get("from_cache", False)
         )
-        
+    
     except Exception as e:
         logger.error(f"Fetch remote key failed: {e}")
         raise HTTPException(status_code=500, detail=f"获取远程密钥失败: {str(e)}")
@@ -525,7 +615,7 @@ async def api_fetch_remote_key(request: FetchKeyRequest):
     response_model=KeyStatusResponse,
     tags=["自动化密钥管理"]
 )
-async def api_get_key_status():
+async def api_get_key_status(request: Request, response: Response):
     """
     获取密钥状态
     
@@ -535,7 +625,14 @@ async def api_get_key_status():
     - 最后检查时间
     - 更新次数
     - 错误次数
+    
+    支持 ETag / If-None-Match, 状态未变化时返回 304。
     """
+    etag = _key_status_etag()
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    
+    response.headers["ETag"] = etag
     status = get_key_status()
     return KeyStatusResponse(**status)
 
@@ -560,16 +657,22 @@ async def api_update_key(force: bool = False):
 
 
 @app.get("/api/current-secret", tags=["自动化密钥管理"])
-async def api_get_current_secret():
+async def api_get_current_secret(request: Request, response: Response):
     """
     获取当前有效密钥
     
     返回当前使用的密钥。如果密钥不存在或已过期,会自动更新。
     
     这是推荐的获取密钥方式,会自动处理缓存和更新。
+    支持 ETag / If-None-Match, 密钥未轮换时返回 304。
     """
     try:
         secret = await get_current_secret()
+        etag = f'W/"{hashlib.sha256(secret.encode()).hexdigest()[:16]}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        
+        response.headers["ETag"] = etag
         return {
             "secret": secret,
             "length": len(secret)
@@ -598,19 +701,20 @@ async def api_auto_signed_request(request: SignedRequestRequest):
     - **time_offset**: 时间偏移量 (毫秒)
     """
     try:
-        # 获取当前密钥
+        # 获取当前密钥 (轮换后同步到共享的签名生成器)
         secret = await get_current_secret()
+        if signature_generator.secret_key != secret:
+            signature_generator.secret_key = secret
         
-        # 创建签名生成器
-        generator = SignatureGenerator()
-        generator.secret_key = secret
-        generator.set_time_offset(request.time_offset)
-        
-        # 生成带签名的请求体
-        signed_body = await generator.create_signed_request(request.request_data)
+        # 生成带签名的请求体 (时间偏移按请求传入, 不修改共享状态)
+        signed_body = signature_generator.create_signed_request(
+            request.request_data,
+            time_offset=request.time_offset,
+            copy=False
+        )
         
         return {"signed_body": signed_body}
-        
+    
     except Exception as e:
         logger.error(f"Auto signed request failed: {e}")
         raise HTTPException(status_code=500, detail=f"创建签名请求失败: {str(e)}")
@@ -644,6 +748,66 @@ async def api_check_key_update(ch_param: Optional[str] = None):
 
 # ================== Instagram API 路由 ==================
 
+def _get_ig_client() -> InstagramAPIClient:
+    """获取应用共享的 Instagram 客户端 (lifespan 未运行时懒加载创建)"""
+    client = getattr(app.state, "ig_client", None)
+    if client is None:
+        client = app.state.ig_client = InstagramAPIClient()
+    return client
+
+
+# 用户信息 / 帖子列表的响应缓存: 有效期 (秒) 与最大条目数
+IG_CACHE_TTL_SECONDS = 60
+IG_CACHE_MAX_ENTRIES = 1024
+
+
+class _TTLCache:
+    """
+    带过期时间的 LRU 缓存
+    
+    条目超过 ttl 秒视为失效; 超过 maxsize 时淘汰最久未使用的条目。
+    """
+    
+    def __init__(self, maxsize: int = IG_CACHE_MAX_ENTRIES, ttl: float = IG_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """获取未过期的缓存值, 不存在或已过期返回 None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Any, value: Any):
+        """写入缓存"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+# 只缓存成功的响应 (序列化后的 JSON 字节), 失败的请求下次仍会访问上游
+_ig_user_cache = _TTLCache()
+_ig_posts_cache = _TTLCache()
+
+
+def _json_body(result: BaseModel) -> bytes:
+    """由 pydantic-core 直接序列化响应模型 (模型已由 InstagramAPIClient 构建并校验)"""
+    return result.model_dump_json().encode('utf-8')
+
+
+def _json_response(body: bytes) -> Response:
+    """返回已序列化的 JSON 响应体"""
+    return Response(content=body, media_type="application/json")
+
+
 class IGUserInfoRequest(BaseModel):
     """Instagram 用户信息请求"""
     username: str = Field(..., description="Instagram 用户名", example="jaychou")
@@ -664,7 +828,12 @@ class IGPostDetailRequest(BaseModel):
     )
 
 
-@app.post("/api/instagram/user-info", response_model=UserInfoResponse, tags=["Instagram API"])
+@app.post(
+    "/api/instagram/user-info",
+    response_model=None,
+    responses={200: {"model": UserInfoResponse}},
+    tags=["Instagram API"]
+)
 async def api_instagram_user_info(request: IGUserInfoRequest):
     """
     获取 Instagram 用户信息
@@ -700,14 +869,26 @@ async def api_instagram_user_info(request: IGUserInfoRequest):
     ```
     """
     try:
-        async with InstagramAPIClient() as client:
-            return await client.get_user_info(request.username)
+        cached = _ig_user_cache.get(request.username)
+        if cached is not None:
+            return _json_response(cached)
+        
+        result = await _get_ig_client().get_user_info(request.username)
+        body = _json_body(result)
+        if result.success:
+            _ig_user_cache.set(request.username, body)
+        return _json_response(body)
     except Exception as e:
         logger.error(f"Instagram user info failed: {e}")
         raise HTTPException(status_code=500, detail=f"获取用户信息失败: {str(e)}")
 
 
-@app.post("/api/instagram/posts", response_model=PostsResponse, tags=["Instagram API"])
+@app.post(
+    "/api/instagram/posts",
+    response_model=None,
+    responses={200: {"model": PostsResponse}},
+    tags=["Instagram API"]
+)
 async def api_instagram_posts(request: IGPostsRequest):
     """
     获取 Instagram 用户帖子列表
@@ -743,14 +924,27 @@ async def api_instagram_posts(request: IGPostsRequest):
     ```
     """
     try:
-        async with InstagramAPIClient() as client:
-            return await client.get_posts(request.username, request.max_id)
+        cache_key = (request.username, request.max_id)
+        cached = _ig_posts_cache.get(cache_key)
+        if cached is not None:
+            return _json_response(cached)
+        
+        result = await _get_ig_client().get_posts(request.username, request.max_id)
+        body = _json_body(result)
+        if result.success:
+            _ig_posts_cache.set(cache_key, body)
+        return _json_response(body)
     except Exception as e:
         logger.error(f"Instagram posts failed: {e}")
         raise HTTPException(status_code=500, detail=f"获取帖子列表失败: {str(e)}")
 
 
-@app.post("/api/instagram/post-detail", response_model=PostDetailResponse, tags=["Instagram API"])
+@app.post(
+    "/api/instagram/post-detail",
+    response_model=None,
+    responses={200: {"model": PostDetailResponse}},
+    tags=["Instagram API"]
+)
 async def api_instagram_post_detail(request: IGPostDetailRequest):
     """
     获取 Instagram 帖子详情
@@ -782,8 +976,8 @@ async def api_instagram_post_detail(request: IGPostDetailRequest):
     ```
     """
     try:
-        async with InstagramAPIClient() as client:
-            return await client.get_post_detail(request.url)
+        result = await _get_ig_client().get_post_detail(request.url)
+        return _json_response(_json_body(result))
     except Exception as e:
         logger.error(f"Instagram post detail failed: {e}")
         raise HTTPException(status_code=500, detail=f"获取帖子详情失败: {str(e)}")
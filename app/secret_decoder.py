@@ -15,30 +15,57 @@ Blob 格式说明:
     - L 字节: 加密数据
 """
 
-from typing import List, Tuple, Dict, Any
+import functools
+import struct
+from typing import Iterator, List, Optional, Tuple, Dict, Any
 from .crypto_utils import (
-    map_custom_to_std_b64,
-    decode_base64_to_bytes,
-    bytes_to_string,
+    decode_custom_b64,
     invert_ops
 )
 
 
-def parse_blob(data: bytes) -> List[Dict[str, Any]]:
+# blob 中的定长字段: 操作 (操作ID, 参数) 与大端序 2 字节长度
+_OP_PAIR = struct.Struct('>BB')
+_U16BE = struct.Struct('>H')
+
+
+def _read_ops(data: bytes, pos: int) -> Tuple[List[Tuple[int, int]], int]:
     """
-    解析加密 blob 数据
+    读取 1 字节的操作数量及其后的 N * 2 字节操作列表
     
     Args:
-        data: 解码后的字节数组
+        data: blob 字节数组
+        pos: 操作数量字段的偏移量
     
     Returns:
-        分块列表, 每个分块包含:
-        - preOps: 预处理操作列表
-        - b64Ops: Base64 操作列表
-        - enc: 加密的数据字符串
+        (操作列表, 操作列表之后的偏移量)
+    
+    Raises:
+        IndexError: 数据长度不足
+    """
+    count = data[pos]
+    pos += 1
+    end = pos + 2 * count
+    if end > len(data):
+        raise IndexError("parse_blob: ops range out of bounds")
+    # 操作列表很短 (通常 0-4 个), 且 invert_ops 需要按顺序折叠, 无法向量化:
+    # 元组列表比 numpy (N, 2) 数组的创建和逐行迭代都快得多
+    return list(_OP_PAIR.iter_unpack(memoryview(data)[pos:end])), end
+
+
+def _iter_chunks(data: bytes) -> Iterator[Tuple[List[Tuple[int, int]], List[Tuple[int, int]], bytes]]:
+    """
+    逐个解析 blob 中的分块
+    
+    Args:
+        data: 解码后的字节数组
+    
+    Yields:
+        (preOps, b64Ops, enc) 三元组, enc 为原样切片自 blob 的 ASCII 字节
     
     Raises:
         ValueError: blob 格式无效
+        IndexError: 数据长度不足
     """
     pos = 0
     
@@ -54,46 +81,86 @@ def parse_blob(data: bytes) -> List[Dict[str, Any]]:
     if version != 1 or not chunk_count:
         raise ValueError("Invalid signing blob")
     
-    chunks = []
-    
     for _ in range(chunk_count):
-        # 读取 preOps
-        pre_ops_count = data[pos]
-        pos += 1
-        
-        pre_ops = []
-        for _ in range(pre_ops_count):
-            op_id = data[pos]
-            op_param = data[pos + 1]
-            pos += 2
-            pre_ops.append((op_id, op_param))
-        
-        # 读取 b64Ops
-        b64_ops_count = data[pos]
-        pos += 1
-        
-        b64_ops = []
-        for _ in range(b64_ops_count):
-            op_id = data[pos]
-            op_param = data[pos + 1]
-            pos += 2
-            b64_ops.append((op_id, op_param))
+        # 读取 preOps / b64Ops (整段一次性按 (操作ID, 参数) 解包)
+        pre_ops, pos = _read_ops(data, pos)
+        b64_ops, pos = _read_ops(data, pos)
         
         # 读取加密数据长度 (大端序)
-        enc_length = (data[pos] << 8) | data[pos + 1]
+        if pos + 2 > len(data):
+            raise IndexError("parse_blob: length out of bounds")
+        enc_length = _U16BE.unpack_from(data, pos)[0]
         pos += 2
         
-        # 读取加密数据
-        enc_data = bytes_to_string(data, pos, enc_length)
+        # 读取加密数据: 保持字节形式, 直接交给 Base64 解码, 不经过 str 转换
+        enc_data = bytes(data[pos:pos + enc_length])
+        if len(enc_data) != enc_length:
+            raise IndexError("parse_blob: enc range out of bounds")
         pos += enc_length
         
-        chunks.append({
-            "preOps": pre_ops,
-            "b64Ops": b64_ops,
-            "enc": enc_data
-        })
+        yield pre_ops, b64_ops, enc_data
+
+
+def parse_blob(data: bytes) -> List[Dict[str, Any]]:
+    """
+    解析加密 blob 数据
+    
+    Args:
+        data: 解码后的字节数组
+    
+    Returns:
+        分块列表, 每个分块包含:
+        - preOps: 预处理操作列表
+        - b64Ops: Base64 操作列表
+        - enc: 加密的数据 (ASCII 字节, 原样切片自 blob)
     
-    return chunks
+    Raises:
+        ValueError: blob 格式无效
+    """
+    return [
+        {"preOps": pre_ops, "b64Ops": b64_ops, "enc": enc_data}
+        for pre_ops, b64_ops, enc_data in _iter_chunks(data)
+    ]
+
+
+def _decode_chunk_bytes(
+    enc_data: bytes,
+    pre_ops: List[Tuple[int, int]],
+    b64_ops: List[Tuple[int, int]],
+    custom_alphabet: str
+) -> bytes:
+    """
+    解码单个分块, 返回明文的 UTF-8 字节
+    
+    明文为 ASCII 时 (密钥总是十六进制字符串) 字节与字符一一对应,
+    preOps 逆操作直接在字节上执行, 不做 UTF-8 解码; 否则 preOps 必须按字符执行,
+    回退到 str 路径。
+    
+    Args:
+        enc_data: 加密数据 (ASCII 字节)
+        pre_ops: 预处理操作列表
+        b64_ops: Base64 操作列表
+        custom_alphabet: 自定义 Base64 字母表
+    
+    Returns:
+        明文的 UTF-8 字节
+    
+    Raises:
+        ValueError: 数据无效 (含非 ASCII 的 Base64 数据 / 非法 UTF-8 等)
+    """
+    # 执行 b64Ops 逆操作 (切片 / 拼接 / 反转对字节同样适用)
+    b64_transformed = invert_ops(enc_data, b64_ops)
+    if not b64_transformed.isascii():
+        # 与 str 路径一致: Base64 数据中不允许出现非 ASCII 字符
+        raise ValueError("Invalid non-ASCII byte in encrypted chunk")
+    
+    # 自定义 Base64 查表 + 解码 (单趟融合)
+    decoded_bytes = decode_custom_b64(b64_transformed, custom_alphabet)
+    
+    # 执行 preOps 逆操作
+    if decoded_bytes.isascii():
+        return invert_ops(decoded_bytes, pre_ops)
+    return invert_ops(decoded_bytes.decode('utf-8'), pre_ops).encode('utf-8')
 
 
 def decode_chunk(chunk: Dict[str, Any], custom_alphabet: str) -> str:
@@ -104,8 +171,8 @@ def decode_chunk(chunk: Dict[str, Any], custom_alphabet: str) -> str:
     1. 对加密数据执行 b64Ops 逆操作
     2. 将自定义 Base64 转换为标准 Base64
     3. 解码 Base64 为字节
-    4. 将字节转换为 UTF-8 字符串
-    5. 对解密后的数据执行 preOps 逆操作
+    4. 对解密后的数据执行 preOps 逆操作 (ASCII 明文直接在字节上执行)
+    5. 将字节转换为 UTF-8 字符串
     
     Args:
         chunk: 分块数据 (包含 preOps, b64Ops, enc)
@@ -114,33 +181,44 @@ def decode_chunk(chunk: Dict[str, Any], custom_alphabet: str) -> str:
     Returns:
         解码后的明文字符串
     """
-    enc_data = chunk["enc"]
-    pre_ops = chunk["preOps"]
-    b64_ops = chunk["b64Ops"]
-    
-    # 步骤 1: 执行 b64Ops 逆操作
-    b64_transformed = invert_ops(enc_data, b64_ops)
-    
-    # 步骤 2: 自定义 Base64 -> 标准 Base64
-    std_b64 = map_custom_to_std_b64(b64_transformed, custom_alphabet)
+    return _decode_chunk_bytes(
+        chunk["enc"], chunk["preOps"], chunk["b64Ops"], custom_alphabet
+    ).decode('utf-8')
+
+
+def parse_and_decode(blob_bytes: bytes, custom_alphabet: str) -> str:
+    """
+    解析并解码 blob
     
-    # 步骤 3: Base64 解码
-    decoded_bytes = decode_base64_to_bytes(std_b64)
+    先完整解析全部分块 (结构或长度无效时与 parse_blob 抛出相同的异常),
+    再逐个解码并拼接, 与 decode_chunk(parse_blob(...)) 逐块拼接的结果及异常一致;
+    分块保持为元组, 不构建中间的分块字典。
     
-    # 步骤 4: UTF-8 解码
-    utf8_string = decoded_bytes.decode('utf-8')
+    Args:
+        blob_bytes: 解码后的 blob 字节数组
+        custom_alphabet: 自定义 Base64 字母表
     
-    # 步骤 5: 执行 preOps 逆操作
-    result = invert_ops(utf8_string, pre_ops)
+    Returns:
+        所有分块明文拼接后的字符串
     
-    return result
+    Raises:
+        ValueError: blob 格式或数据无效
+        IndexError: 数据长度不足
+    """
+    chunks = list(_iter_chunks(blob_bytes))
+    return "".join([
+        _decode_chunk_bytes(enc_data, pre_ops, b64_ops, custom_alphabet).decode('utf-8')
+        for pre_ops, b64_ops, enc_data in chunks
+    ])
 
 
+@functools.lru_cache(maxsize=32)
 def decode_secret_from_blob(encrypted_data: str, custom_alphabet: str) -> str:
     """
-    从加密的 blob 中解码密钥
+    从加密的 blob 中解码密钥 (按参数缓存结果)
     
     这是主要的解密函数,完整实现了 JavaScript 中的 decodeSecretFromBlob 函数。
+    输入与输出均为不可变的 str, 相同的 blob / 字母表只解码一次 (解码失败不缓存)。
     
     工作流程:
     1. 将自定义 Base64 编码的数据转换为标准 Base64
@@ -161,22 +239,11 @@ def decode_secret_from_blob(encrypted_data: str, custom_alphabet: str) -> str:
         >>> alphabet = "05c4LAGfVl9d6pkOEQ1o8r+wz7FgRUTHeJqKDythXn3YSvBMsPjaiN2ub/CIWZmx"
         >>> secret = decode_secret_from_blob(encrypted, alphabet)
     """
-    # 步骤 1: 自定义 Base64 -> 标准 Base64
-    std_b64 = map_custom_to_std_b64(encrypted_data, custom_alphabet)
-    
-    # 步骤 2: Base64 解码
-    blob_bytes = decode_base64_to_bytes(std_b64)
+    # 步骤 1-2: 自定义 Base64 查表 + 解码 (单趟融合)
+    blob_bytes = decode_custom_b64(encrypted_data, custom_alphabet)
     
-    # 步骤 3: 解析 blob
-    chunks = parse_blob(blob_bytes)
-    
-    # 步骤 4-5: 解密每个分块并拼接
-    result_parts = []
-    for chunk in chunks:
-        decoded = decode_chunk(chunk, custom_alphabet)
-        result_parts.append(decoded)
-    
-    return "".join(result_parts)
+    # 步骤 3-5: 解析 blob, 解密每个分块并拼接 (单趟完成)
+    return parse_and_decode(blob_bytes, custom_alphabet)
 
 
 # 预配置的加密数据和字母表 (来自 link.chunk.js)
@@ -193,13 +260,21 @@ DEFAULT_ENCRYPTED_DATA = (
 DEFAULT_CUSTOM_ALPHABET = "05c4LAGfVl9d6pkOEQ1o8r+wz7FgRUTHeJqKDythXn3YSvBMsPjaiN2ub/CIWZmx"
 
 
+# 默认密钥在首次调用 get_default_secret 时解码 (不在导入时解码, 避免拖慢启动)
+_DEFAULT_SECRET: Optional[str] = None
+
+
 def get_default_secret() -> str:
     """
     获取默认的解密密钥
     
-    使用预配置的加密数据和字母表解密密钥。
+    使用预配置的加密数据和字母表解密密钥。输入都是模块常量, 首次调用时解码,
+    之后直接返回模块级缓存的结果。
     
     Returns:
         解密后的密钥
     """
-    return decode_secret_from_blob(DEFAULT_ENCRYPTED_DATA, DEFAULT_CUSTOM_ALPHABET)
+    global _DEFAULT_SECRET
+    if _DEFAULT_SECRET is None:
+        _DEFAULT_SECRET = decode_secret_from_blob(DEFAULT_ENCRYPTED_DATA, DEFAULT_CUSTOM_ALPHABET)
+    return _DEFAULT_SECRET
@@ -10,13 +10,23 @@ _s = HMAC-SHA256(secret_key_bytes, data + timestamp)
 - secret_key_bytes: 从加密 blob 解码的密钥 (hex 转 bytes)
 - data: 请求数据 (URL 字符串或 JSON 序列化的对象)
 - timestamp: 时间戳 (毫秒)
+
+HMAC 由 hashlib (OpenSSL EVP) 计算, OpenSSL 会在支持 SHA-NI / ARMv8 SHA2
+扩展的 CPU 上自动使用硬件指令, 无需额外依赖。可用 OPENSSL_ia32cap 环境变量
+屏蔽 CPU 特性以对比软件实现的性能 (例如 OPENSSL_ia32cap=:~0x20000000 关闭 SHA-NI)。
 """
 
+import functools
 import hashlib
-import hmac
 import json
+import threading
 import time
-from typing import Union, Dict, Any, Optional
+from typing import Union, Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # 可选依赖, 缺失时使用标准库 json
+    orjson = None
 
 from .secret_decoder import decode_secret_from_blob, get_default_secret
 
@@ -25,7 +35,8 @@ def sort_object_keys(obj: Dict[str, Any]) -> Dict[str, Any]:
     """
     按字母顺序排序对象的键
     
-    递归处理嵌套对象。
+    递归处理嵌套对象。列表 (及其中的对象) 原样保留, 不做排序:
+    这是签名数据格式的一部分, 修改会导致含列表的请求签名不一致。
     
     Args:
         obj: 输入字典
@@ -37,7 +48,7 @@ def sort_object_keys(obj: Dict[str, Any]) -> Dict[str, Any]:
         return obj
     
     result = {}
-    for key in sorted(obj.keys()):
+    for key in sorted(obj):
         value = obj[key]
         if isinstance(value, dict):
             result[key] = sort_object_keys(value)
@@ -61,85 +72,265 @@ def sha256_hash(data: str) -> str:
     return hash_bytes.hex()
 
 
-def hmac_sha256_sign(message: str, secret_key: str) -> str:
+# HMAC 块大小 (SHA-256 为 64 字节)
+_HMAC_BLOCK_SIZE = 64
+
+# ipad / opad 异或转换表
+_TRANS_36 = bytes(b ^ 0x36 for b in range(256))
+_TRANS_5C = bytes(b ^ 0x5C for b in range(256))
+
+
+@functools.lru_cache(maxsize=8)
+def _hmac_prototype(secret_key: Union[str, bytes]) -> Tuple[bytes, "hashlib._Hash", "hashlib._Hash"]:
     """
-    使用 HMAC-SHA256 签名
+    获取指定密钥的 HMAC 内/外层哈希原型 (带缓存)
+    
+    按 RFC 2104 直接用 hashlib 实现 HMAC: 密钥补齐到 64 字节后分别与
+    ipad (0x36) / opad (0x5c) 异或, 并预先压缩进两个 sha256 对象。
+    每个密钥只做一次, 之后每次签名只需 copy() 两个原型。
+    密钥轮换时由 key_updater 调用 clear_hmac_cache() 释放旧密钥。
     
     Args:
-        message: 待签名消息
-        secret_key: 十六进制密钥字符串 (64 字符 = 32 字节)
+        secret_key: 十六进制密钥字符串, 或已解码的密钥字节
+    
+    Returns:
+        (key_bytes, 内层 sha256 原型, 外层 sha256 原型)
+    """
+    key_bytes = secret_key if isinstance(secret_key, bytes) else bytes.fromhex(secret_key)
+    if len(key_bytes) > _HMAC_BLOCK_SIZE:
+        key_bytes = hashlib.sha256(key_bytes).digest()
+    key_padded = key_bytes.ljust(_HMAC_BLOCK_SIZE, b"\x00")
+    inner = hashlib.sha256(key_padded.translate(_TRANS_36))
+    outer = hashlib.sha256(key_padded.translate(_TRANS_5C))
+    return key_bytes, inner, outer
+
+
+def clear_hmac_cache():
+    """清空 HMAC 原型缓存 (密钥轮换后调用, 避免旧密钥常驻内存)"""
+    _hmac_prototype.cache_clear()
+
+
+def hmac_sha256_hex(message: bytes, secret_key: Union[str, bytes]) -> str:
+    """
+    使用缓存的内/外层原型计算 HMAC-SHA256
+    
+    每次签名只需 copy() 两个已吸收 ipad/opad 块的 OpenSSL sha256 状态,
+    全程在 C 中完成, 比 hmac.digest (每次重新处理密钥块) 更快。
+    传入已解码的密钥字节时跳过 bytes.fromhex。
+    
+    Args:
+        message: 待签名消息 (字节)
+        secret_key: 十六进制密钥字符串, 或已解码的密钥字节
     
     Returns:
         十六进制格式的签名 (64个字符)
     """
-    key_bytes = bytes.fromhex(secret_key)
-    return hmac.new(key_bytes, message.encode('utf-8'), hashlib.sha256).hexdigest()
+    _, inner_proto, outer_proto = _hmac_prototype(secret_key)
+    return _hmac_hex_from_prototypes(message, inner_proto, outer_proto)
 
 
-async def generate_signature(
-    request_data: Union[str, Dict[str, Any]],
+def _hmac_hex_from_prototypes(message: bytes, inner_proto: "hashlib._Hash", outer_proto: "hashlib._Hash") -> str:
+    """由已吸收 ipad / opad 块的 sha256 原型计算 HMAC (十六进制)"""
+    inner = inner_proto.copy()
+    inner.update(message)
+    outer = outer_proto.copy()
+    outer.update(inner.digest())
+    return outer.hexdigest()
+
+
+def _sign_data(
+    data_bytes: bytes,
     timestamp: int,
-    secret_key: str
+    inner_proto: "hashlib._Hash",
+    outer_proto: "hashlib._Hash"
 ) -> str:
     """
-    生成 API 请求签名
+    计算 HMAC-SHA256(data + timestamp) (十六进制)
     
-    这是核心签名函数,实现了 JavaScript 中的签名生成逻辑。
+    data 与时间戳分别送入内层哈希, 不拼接出完整的签名消息。
+    """
+    inner = inner_proto.copy()
+    inner.update(data_bytes)
+    # int 用 C 层的 b'%d' 格式化; 其他类型与 f"{data}{timestamp}" 保持一致
+    inner.update(b'%d' % timestamp if type(timestamp) is int else str(timestamp).encode('utf-8'))
+    outer = outer_proto.copy()
+    outer.update(inner.digest())
+    return outer.hexdigest()
+
+
+def hmac_sha256_hex_batch(messages: List[bytes], secret_key: Union[str, bytes]) -> List[str]:
+    """
+    使用同一密钥批量计算 HMAC-SHA256
     
-    签名计算公式:
-    _s = HMAC-SHA256(secret_key_bytes, data_string + timestamp)
+    密钥只解码 / 预处理一次, 所有消息复用同一对内/外层原型。
     
     Args:
-        request_data: 请求数据
-            - 字符串: 直接使用 (通常是 URL)
-            - 字典: 先按键排序后 JSON 序列化
-        timestamp: 时间戳 (毫秒)
-        secret_key: 解密后的密钥 (十六进制字符串)
+        messages: 待签名消息列表 (字节)
+        secret_key: 十六进制密钥字符串, 或已解码的密钥字节
     
     Returns:
-        64位十六进制签名字符串
+        十六进制签名列表, 与 messages 顺序一致
+    """
+    _, inner_proto, outer_proto = _hmac_prototype(secret_key)
+    return [_hmac_hex_from_prototypes(m, inner_proto, outer_proto) for m in messages]
+
+
+def hmac_sha256_sign(message: str, secret_key: Union[str, bytes]) -> str:
+    """
+    使用 HMAC-SHA256 签名
+    
+    Args:
+        message: 待签名消息
+        secret_key: 十六进制密钥字符串 (64 字符 = 32 字节), 或已解码的密钥字节
+    
+    Returns:
+        十六进制格式的签名 (64个字符)
+    """
+    return hmac_sha256_hex(message.encode('utf-8'), secret_key)
+
+
+# orjson 与 json.dumps(separators, ensure_ascii=False) 输出完全一致的值类型
+# (浮点数格式不同, 如 1e+16 / 1e16, 因此不走 orjson)
+_ORJSON_SAFE_TYPES = (str, int, bool, type(None))
+
+
+def _contains_sequence(obj: Dict[str, Any]) -> bool:
+    """检查字典 (含嵌套字典) 中是否出现列表或元组 (json 都序列化为数组)"""
+    for value in obj.values():
+        if isinstance(value, (list, tuple)) or (isinstance(value, dict) and _contains_sequence(value)):
+            return True
+    return False
+
+
+def _dumps_sorted(data: Dict[str, Any], nested: bool = True) -> str:
+    """
+    用标准库 json 按键排序并序列化为紧凑 JSON
+    
+    nested=True 时按 sort_object_keys 递归排序嵌套字典 (签名模块的格式);
+    nested=False 时只排序顶层键 (instagram_api 请求体的格式)。
+    
+    不含列表 / 元组的字典由 json.dumps(sort_keys=True) 在 C 编码器中一趟完成排序和序列化。
+    sort_object_keys 不会排序数组中的字典, 而 sort_keys 会, 因此含列表或元组时
+    走 sort_object_keys + json.dumps。
+    """
+    if not nested:
+        return json.dumps({key: data[key] for key in sorted(data)}, separators=(',', ':'), ensure_ascii=False)
+    if not _contains_sequence(data):
+        try:
+            return json.dumps(data, separators=(',', ':'), ensure_ascii=False, sort_keys=True)
+        except TypeError:
+            pass  # 键类型混杂无法比较等, 交给下方路径处理 (抛出同样的异常)
+    return json.dumps(sort_object_keys(data), separators=(',', ':'), ensure_ascii=False)
+
+
+def _orjson_dumps_sorted(data: Dict[str, Any]) -> Optional[bytes]:
+    """
+    扁平且只含 str/int/bool/None 的字典用 orjson 序列化 (OPT_SORT_KEYS 在 Rust 侧排序)
+    
+    扁平字典不涉及嵌套排序, 输出与两种 _dumps_sorted 模式都逐字节一致;
+    orjson 不可用或数据不满足条件时返回 None。
+    """
+    if orjson is not None and all(type(v) in _ORJSON_SAFE_TYPES for v in data.values()):
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass  # 非 str 键 / 超出 64 位的整数 / 孤立代理字符等
+    return None
+
+
+def serialize_sorted(data: Dict[str, Any], nested: bool = True) -> str:
+    """
+    按键排序并序列化为紧凑 JSON (优先 orjson, 否则回退到 _dumps_sorted)
+    
+    Args:
+        data: 请求数据字典
+        nested: 是否递归排序嵌套字典 (True 为签名模块的格式, False 只排序顶层键,
+            为 instagram_api 请求体的格式)
+    
+    Returns:
+        紧凑 JSON 字符串
+    """
+    data_bytes = _orjson_dumps_sorted(data)
+    if data_bytes is not None:
+        return data_bytes.decode('utf-8')
+    return _dumps_sorted(data, nested)
+
+
+def serialize_request_data(request_data: Union[str, Dict[str, Any]]) -> str:
+    """
+    构造签名用的 data_string
+    
+    字符串 (通常是 URL) 原样返回; 字典按键排序后序列化为紧凑 JSON。
+    同一份请求数据需要反复签名时 (如轮询), 可以只序列化一次, 把结果作为
+    request_data 传给 generate_signature, 或作为 precomputed_data_string
+    传给 SignatureGenerator.create_signed_request。
+    
+    Args:
+        request_data: 请求数据 (字符串或字典)
+    
+    Returns:
+        签名消息中的数据部分
     """
-    # 根据数据类型处理
     if isinstance(request_data, str):
-        data_string = request_data
-    else:
-        # 对象需要按键排序后序列化
-        sorted_data = sort_object_keys(request_data)
-        data_string = json.dumps(sorted_data, separators=(',', ':'), ensure_ascii=False)
+        return request_data
+    return serialize_sorted(request_data)
+
+
+def serialize_request_bytes(request_data: Union[str, bytes, Dict[str, Any]]) -> bytes:
+    """
+    构造签名用的 data_string 的 UTF-8 字节
+    
+    与 serialize_request_data 输出相同, 但 orjson 路径直接产出字节,
+    省去 decode 再 encode 的往返; 已是字节的数据原样返回。
     
-    # 签名消息: data + timestamp
-    message = f"{data_string}{timestamp}"
+    Args:
+        request_data: 请求数据 (字符串 / 已序列化的 UTF-8 字节 / 字典)
     
-    # 计算 HMAC-SHA256
-    return hmac_sha256_sign(message, secret_key)
+    Returns:
+        签名消息中的数据部分 (UTF-8 字节)
+    """
+    if isinstance(request_data, bytes):
+        return request_data
+    if isinstance(request_data, str):
+        return request_data.encode('utf-8')
+    data_bytes = _orjson_dumps_sorted(request_data)
+    if data_bytes is None:
+        data_bytes = _dumps_sorted(request_data).encode('utf-8')
+    return data_bytes
 
 
-def generate_signature_sync(
-    request_data: Union[str, Dict[str, Any]],
+def generate_signature(
+    request_data: Union[str, bytes, Dict[str, Any]],
     timestamp: int,
-    secret_key: str
+    secret_key: Union[str, bytes]
 ) -> str:
     """
-    同步版本的签名生成函数
+    生成 API 请求签名
     
-    功能与 generate_signature 完全相同,但是同步执行。
+    这是核心签名函数,实现了 JavaScript 中的签名生成逻辑。
+    纯 CPU 计算, 没有 I/O, 因此是同步函数 (无需 await, 也不创建协程)。
+    
+    签名计算公式:
+    _s = HMAC-SHA256(secret_key_bytes, data_string + timestamp)
     
     Args:
-        request_data: 请求数据 (字符串或字典)
+        request_data: 请求数据
+            - 字符串: 直接使用 (通常是 URL)
+            - 字节: 已序列化的 data_string (UTF-8), 直接使用
+            - 字典: 先按键排序后 JSON 序列化
         timestamp: 时间戳 (毫秒)
-        secret_key: 解密后的密钥 (十六进制字符串)
+        secret_key: 解密后的密钥 (十六进制字符串, 或已解码的密钥字节)
     
     Returns:
         64位十六进制签名字符串
     """
-    if isinstance(request_data, str):
-        data_string = request_data
-    else:
-        sorted_data = sort_object_keys(request_data)
-        data_string = json.dumps(sorted_data, separators=(',', ':'), ensure_ascii=False)
-    
-    message = f"{data_string}{timestamp}"
-    return hmac_sha256_sign(message, secret_key)
+    # 签名消息: data + timestamp, 计算 HMAC-SHA256
+    _, inner_proto, outer_proto = _hmac_prototype(secret_key)
+    return _sign_data(serialize_request_bytes(request_data), timestamp, inner_proto, outer_proto)
+
+
+# 兼容旧名称: generate_signature 已是同步函数
+generate_signature_sync = generate_signature
 
 
 class SignatureGenerator:
@@ -155,7 +346,7 @@ class SignatureGenerator:
     
     Example:
         >>> generator = SignatureGenerator()
-        >>> signed_body = await generator.create_signed_request({"sf_url": "/api/user"})
+        >>> signed_body = generator.create_signed_request({"sf_url": "/api/user"})
     """
     
     def __init__(
@@ -179,6 +370,19 @@ class SignatureGenerator:
         
         self.time_offset = time_offset
     
+    @property
+    def secret_key(self) -> str:
+        """解密后的密钥 (十六进制字符串)"""
+        return self._secret_key
+    
+    @secret_key.setter
+    def secret_key(self, value: str):
+        # 同时缓存解码后的密钥字节和 ipad / opad 原型: 签名时不再重复 bytes.fromhex,
+        # 也不必查 _hmac_prototype 的全局缓存 (轮换时原型随密钥一起替换)
+        self._secret_key = value
+        self._secret_key_bytes = bytes.fromhex(value)
+        _, self._inner_proto, self._outer_proto = _hmac_prototype(self._secret_key_bytes)
+    
     def set_time_offset(self, offset: int):
         """
         设置时间偏移量
@@ -190,16 +394,21 @@ class SignatureGenerator:
         """
         self.time_offset = offset
     
-    def get_corrected_timestamp(self) -> int:
+    def get_corrected_timestamp(self, time_offset: Optional[int] = None) -> int:
         """
         获取校正后的时间戳
         
+        Args:
+            time_offset: 可选的时间偏移量 (默认使用 self.time_offset)
+        
         Returns:
             校正后的毫秒时间戳
         """
-        return int(time.time() * 1000) - self.time_offset
+        if time_offset is None:
+            time_offset = self.time_offset
+        return int(time.time() * 1000) - time_offset
     
-    async def generate_signature(
+    def generate_signature(
         self,
         request_data: Union[str, Dict[str, Any]],
         timestamp: Optional[int] = None
@@ -217,12 +426,17 @@ class SignatureGenerator:
         if timestamp is None:
             timestamp = self.get_corrected_timestamp()
         
-        return await generate_signature(request_data, timestamp, self.secret_key)
+        return _sign_data(
+            serialize_request_bytes(request_data), timestamp, self._inner_proto, self._outer_proto
+        )
     
-    async def create_signed_request(
+    def create_signed_request(
         self,
         request_data: Union[str, Dict[str, Any]],
-        timestamp_key: Optional[int] = None
+        timestamp_key: Optional[int] = None,
+        time_offset: Optional[int] = None,
+        precomputed_data_string: Optional[str] = None,
+        copy: bool = True
     ) -> Dict[str, Any]:
         """
         创建带签名的请求体
@@ -237,24 +451,39 @@ class SignatureGenerator:
         Args:
             request_data: 原始请求数据
             timestamp_key: 可选的指定时间戳
+            time_offset: 可选的本次请求时间偏移量 (不修改 self.time_offset,
+                共享的生成器可被并发请求安全复用)
+            precomputed_data_string: 可选的 serialize_request_data(request_data) 结果,
+                同一份数据反复签名时跳过排序和 JSON 序列化 (须与 request_data 一致)
+            copy: 是否复制字典形式的 request_data; 调用方之后不再使用该字典时
+                可传 False, 直接在其上添加签名字段并返回
         
         Returns:
             带签名的完整请求体
         """
-        timestamp = timestamp_key or self.get_corrected_timestamp()
-        signature = await self.generate_signature(request_data, timestamp)
+        if time_offset is None:
+            time_offset = self.time_offset
+        # ts 与 _ts 共用一次时间读取 (两者只差校正偏移量)
+        now_ms = int(time.time() * 1000)
+        timestamp = timestamp_key or now_ms - time_offset
+        if precomputed_data_string is None:
+            signature = self.generate_signature(request_data, timestamp)
+        else:
+            signature = self.generate_signature(precomputed_data_string, timestamp)
         
         # 构建请求体
         if isinstance(request_data, str):
             result = {"sf_url": request_data}
-        else:
+        elif copy:
             result = dict(request_data)
+        else:
+            result = request_data
         
         # 添加签名相关字段
         result.update({
             "ts": timestamp,
-            "_ts": int(time.time() * 1000),  # 构建时间戳
-            "_tsc": self.time_offset,
+            "_ts": now_ms,  # 构建时间戳
+            "_tsc": time_offset,
             "_sv": 2,
             "_s": signature
         })
@@ -264,6 +493,7 @@ class SignatureGenerator:
 
 # 全局默认签名生成器实例
 _default_generator: Optional[SignatureGenerator] = None
+_default_generator_lock = threading.Lock()
 
 
 def get_default_generator() -> SignatureGenerator:
@@ -271,19 +501,25 @@ def get_default_generator() -> SignatureGenerator:
     获取默认的签名生成器实例
     
     使用懒加载模式,首次调用时初始化。
+    双重检查加锁: 多线程并发首次调用时只创建一个实例, 初始化之后的调用不加锁。
     
     Returns:
         SignatureGenerator 实例
     """
     global _default_generator
-    if _default_generator is None:
-        _default_generator = SignatureGenerator()
-    return _default_generator
+    generator = _default_generator
+    if generator is None:
+        with _default_generator_lock:
+            generator = _default_generator
+            if generator is None:
+                generator = _default_generator = SignatureGenerator()
+    return generator
 
 
-async def create_signed_request(
+def create_signed_request(
     request_data: Union[str, Dict[str, Any]],
-    time_offset: int = 0
+    time_offset: int = 0,
+    copy: bool = True
 ) -> Dict[str, Any]:
     """
     便捷函数: 创建带签名的请求体
@@ -291,10 +527,10 @@ async def create_signed_request(
     Args:
         request_data: 请求数据
         time_offset: 时间偏移量
+        copy: 是否复制字典形式的 request_data (见 SignatureGenerator.create_signed_request)
     
     Returns:
         带签名的请求体
     """
-    generator = get_default_generator()
-    generator.set_time_offset(time_offset)
-    return await generator.create_signed_request(request_data)
+    # 时间偏移按调用传入, 不修改共享实例的状态 (并发调用互不影响)
+    return get_default_generator().create_signed_request(request_data, time_offset=time_offset, copy=copy)
@@ -12,6 +12,7 @@
  *   Phase 5: 清理优化 (属性简化、布尔值、十六进制还原、死代码移除)
  * 
  * 使用: node deobfuscator-v4.js <input.js>
+ *       node deobfuscator-v4.js --server   (常驻服务模式, 见 serve())
  */
 
 const fs = require('fs');
@@ -1067,9 +1068,80 @@ function processFile(inputPath) {
     return outputPath;
 }
 
+/**
+ * 常驻服务模式: 通过 stdin/stdout 管道逐个处理请求, 省去每次启动 Node 和 V8 预热
+ *
+ * 协议 (长度均为 4 字节大端):
+ *   请求: [长度][UTF-8 源码]
+ *   响应: [状态 1 字节: 0 成功 / 1 失败][长度][UTF-8 结果或错误信息]
+ *
+ * stdout 只用于响应帧, 日志全部改写到 stderr。
+ */
+function serve() {
+    console.log = (...args) => console.error(...args);
+
+    let chunks = [];
+    let buffered = 0;
+
+    function take(n) {
+        const all = chunks.length === 1 ? chunks[0] : Buffer.concat(chunks, buffered);
+        const head = all.subarray(0, n);
+        const rest = all.subarray(n);
+        chunks = rest.length ? [rest] : [];
+        buffered = rest.length;
+        return head;
+    }
+
+    function peekLength() {
+        const all = chunks.length === 1 ? chunks[0] : Buffer.concat(chunks, buffered);
+        chunks = [all];
+        return all.readUInt32BE(0);
+    }
+
+    let pending = -1;
+
+    process.stdin.on('data', (chunk) => {
+        chunks.push(chunk);
+        buffered += chunk.length;
+
+        while (true) {
+            if (pending < 0) {
+                if (buffered < 4) break;
+                pending = peekLength();
+                take(4);
+            }
+            if (buffered < pending) break;
+
+            const code = take(pending).toString('utf-8');
+            pending = -1;
+
+            let status = 0;
+            let payload;
+            try {
+                payload = Buffer.from(deobfuscate(code, 'input.js'), 'utf-8');
+            } catch (error) {
+                status = 1;
+                payload = Buffer.from(String((error && error.stack) || error), 'utf-8');
+            }
+
+            const header = Buffer.alloc(5);
+            header.writeUInt8(status, 0);
+            header.writeUInt32BE(payload.length, 1);
+            process.stdout.write(Buffer.concat([header, payload]));
+        }
+    });
+
+    process.stdin.on('end', () => process.exit(0));
+}
+
 function main() {
     const args = process.argv.slice(2);
 
+    if (args[0] === '--server') {
+        serve();
+        return;
+    }
+
     if (args.length === 0) {
         console.log(`
 JavaScript 反混淆工具 v4.0
@@ -1087,6 +1159,7 @@ JavaScript 反混淆工具 v4.0
 
 使用方法:
   node deobfuscator-v4.js <input.js>
+  node deobfuscator-v4.js --server    常驻服务模式 (stdin/stdout 长度前缀协议)
 
 示例:
   node deobfuscator-v4.js link.chunk.js
@@ -1124,7 +1197,7 @@ JavaScript 反混淆工具 v4.0
     outputFiles.forEach(f => console.log(`  - ${f}`));
 }
 
-module.exports = { deobfuscate, processFile, LZString };
+module.exports = { deobfuscate, processFile, serve, LZString };
 
 if (require.main === module) {
     main();